@@ -15,8 +15,54 @@ from discord.ext import commands
 # This class imports the Music player from the musicplayer.py
 from Music_player import MusicPlayer
 
-# This import imports the youtube source class from song.py
-from Song import YTDLSource
+# This import brings in the bulk import of the playall command
+from playlist_import import PlaylistImport, attachment_lines, file_lines
+
+# This import brings in the settings of the bot
+import config
+
+# This import brings in the event loop watchdog
+from watchdog import LoopWatchdog
+
+# This import brings in the metrics of the command stages and their exporter
+from metrics import registry
+from metrics_export import MetricsExporter
+
+# This import is used to measure the duration of the commands
+import time
+
+# This import imports the youtube source class and the extractor pool from song.py
+from song import YTDLSource, TrackSource, ytdl
+
+# This import brings in the search cache shared by the guilds
+from cache import trackCache
+
+# This import brings in the persistent index of the resolved songs
+from track_index import trackIndex
+
+# This import brings in the disk cache of the songs played often
+from audio_cache import audioCache
+
+# This import brings in the streams shared by the guilds playing the same song
+from shared_audio import sharedAudio
+
+# This import brings in the snapshots of the queues which survive a restart
+from snapshot import Snapshots, capture, restore
+
+# This import brings in the hibernation of the players which are paused for long or alone in their voice channel
+from hibernation import Hibernation, listeners
+
+# This import brings in the profile of the cold start
+from startup import startupProfile
+
+# This import brings in the loudness measurements of the songs
+from loudness import loudness
+
+# This import brings in the read ahead statistics of the guilds
+from read_ahead import bufferStats
+
+# This import brings in the outboxes of the text channels and the rate limits they have seen
+from outbox import outbox_for, outboxes, rateLimits
 
 # This import brings in the discord library
 import discord
@@ -24,18 +70,12 @@ import discord
 # This import brings the additional asynchronous abilities to the program
 import asyncio
 
-# This import brings in the iteration tools
-import itertools
-
-# This import brings in the shuffle function from the random class
-from random import shuffle
-
-# This import brings in the request capabilities to the program
-import requests
-
 # This import brings in the file handling capabilities
 import os
 
+# This is used to reject the times which are not a number of seconds, like nan and inf
+import math
+
 
 # Custom Exception classes for the bot
 class VoiceConnectionError(commands.CommandError):
@@ -46,6 +86,13 @@ class InvalidVoiceChannel(VoiceConnectionError):
     """Exception for cases of invalid Voice Channels."""
 
 
+# The commands which do not restore the saved queue of a guild
+SNAPSHOT_IDLE_COMMANDS = ('help', 'hello', 'ping', 'stats')
+
+# The commands which run for minutes do not hold back the informational messages of their channel
+OUTBOX_LONG_COMMANDS = ('playall',)
+
+
 # Embed message for the connect function of the bot
 notInChannel = discord.Embed(
     description='First join a voice channel before you use this command',
@@ -64,6 +111,29 @@ def customEmbed(description):
     )
 
 
+def parseTime(text):
+    # Reads a time like 90, 1:30 or 1:02:03 in seconds, a leading + or - makes it relative to the current second
+    # Returns the seconds and the sign, or None if the time can not be read
+    text = text.strip()
+    sign = text[0] if text[:1] in ('+', '-') else ''
+    seconds = 0
+    try:
+        for part in text.lstrip('+-').split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None
+
+    if not math.isfinite(seconds):
+        return None
+    return seconds, sign
+
+
+def formatTime(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02}:{seconds:02}' if hours else f'{minutes}:{seconds:02}'
+
+
 botNotInChannel = discord.Embed(
     description='I am not currently connected to voice!',
     colour=discord.Colour.blue()
@@ -77,27 +147,137 @@ botNotPlaying = discord.Embed(
 # This class defines the structure of the bot with commands
 class MusicBot(commands.Cog):
     # This class will be the structure of music bot
-    __slots__ = ('bot', 'players','cmdPrefix')
+    __slots__ = ('bot', 'players','cmdPrefix', 'watchdog', 'exporter', 'snapshots', 'hibernation')
 
     def __init__(self, bot,cmd):
         self.bot = bot
         self.players = {}
         self.cmdPrefix = cmd
 
+        # The watchdog is opt in, it measures the event loop lag and logs the blocking code
+        self.watchdog = None
+        if config.LOOP_WATCHDOG:
+            self.watchdog = LoopWatchdog()
+            bot.loop.create_task(self.watchdog.run())
+
+        # The metrics are exported if a port or a file is set for them
+        self.exporter = None
+        if config.METRICS_PORT or config.METRICS_FILE:
+            self.exporter = MetricsExporter(bot.shard_id)
+            bot.loop.create_task(self.exporter.run())
+
+        # The songs of every shard are downloaded to its own directory
+        audioCache.use_shard(bot.shard_id, bot.shard_count)
+        ytdl.options = dict(ytdl.options, outtmpl=f'{audioCache.directory}/%(extractor)s-%(id)s.%(ext)s')
+
+        # The queues saved before the restart are restored once their guild uses a command again
+        self.snapshots = Snapshots(bot.shard_id)
+        self.snapshots.load()
+        bot.loop.create_task(self.snapshots.run(self.players))
+
+        # The players which are not listened to are hibernated into the snapshot records
+        self.hibernation = Hibernation()
+        bot.loop.create_task(self.hibernation.run(self))
+
+    def cog_unload(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.exporter is not None:
+            self.bot.loop.create_task(self.exporter.close())
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # READY is sent again after a reconnect, the startup is only reported once
+        if not startupProfile.mark('ready'):
+            return
+
+        startupProfile.stop_tracing()
+        startupProfile.report('ready')
+
+        # The extractor is prepared once the gateway is connected instead of while the bot imports
+        await ytdl.warm_up()
+        startupProfile.mark('extractor_ready')
+        startupProfile.report('extractor_ready')
+
+    async def cog_before_invoke(self, ctx):
+        # Names the task of the command so the watchdog can tell which command blocked the event loop
+        ctx.started = time.monotonic()
+        if self.watchdog is not None:
+            self.watchdog.label(f'{self.cmdPrefix}{ctx.command}', ctx.guild and ctx.guild.id)
+
+        # The informational messages of the channel wait until the command has replied
+        ctx.outbox = outboxes.get(ctx.channel.id) if ctx.command.name not in OUTBOX_LONG_COMMANDS else None
+        if ctx.outbox is not None:
+            ctx.outbox.reply_started()
+
+        if ctx.guild and ctx.guild.id in self.snapshots and ctx.command.name not in SNAPSHOT_IDLE_COMMANDS:
+            await self.revive(ctx)
+
+    async def revive(self, ctx):
+        # Rebuilds the player of a guild from its saved or hibernated record, the stop command drops the record instead
+        record = self.snapshots.take(ctx.guild.id)
+        if ctx.command.name == 'stop':
+            return
+
+        # The saved voice channel is only joined again if someone is listening in it
+        channel = getattr(ctx.author.voice, 'channel', None)
+        if channel is None:
+            channel = ctx.guild.get_channel(record['v'] or 0)
+            if channel is None or not listeners(channel):
+                self.snapshots.put(ctx.guild.id, record)
+                return
+
+        if not ctx.voice_client:
+            try:
+                with registry.timer('voice_connect_seconds', kind='connect'):
+                    await channel.connect()
+            except (asyncio.TimeoutError, discord.ClientException):
+                # The record is kept so a later command can try again
+                self.snapshots.put(ctx.guild.id, record)
+                return
+
+        count = restore(self.get_player(ctx), record)
+        registry.inc('players_restored_total')
+        outbox_for(ctx.channel, self.bot.loop).post(embed=customEmbed(
+            f'Restored the queue of **{count}** songs.'))
+
+    async def hibernate(self, guild, reason):
+        # Keeps the queue of the player as a record and releases its task, voice client and ffmpeg process
+        player = self.players.get(guild.id)
+        if player is None:
+            return
+
+        record = capture(player)
+        if record['q']:
+            self.snapshots.put(guild.id, record)
+        registry.inc('players_hibernated_total', reason=reason)
+        await self.cleanup(guild)
+
+    def save_snapshot(self):
+        # Called when the bot is closing, before the voice clients are disconnected
+        self.snapshots.save(self.players)
+
+    async def cog_after_invoke(self, ctx):
+        registry.observe('command_seconds', time.monotonic() - ctx.started, command=str(ctx.command))
+        if ctx.outbox is not None:
+            ctx.outbox.reply_finished()
+
     # This function is cleanup the music player once the bot leaves the voice channel
     async def cleanup(self, guild):
+        # The player task is stopped first so it does not start the next song while the voice client disconnects
+        self.hibernation.forget(guild.id)
+        player = self.players.pop(guild.id, None)
+        if player is not None:
+            player.task.cancel()
+            player.prefetcher.clear()
+            player.outbox.discard('now_playing')
+
         try:
             await guild.voice_client.disconnect()
 
         except AttributeError:
             pass
 
-        try:
-            del self.players[guild.id]
-
-        except KeyError:
-            pass
-
     # Local error handling functions to record the error happened during runtime
     async def __local_check(self, ctx):
         # A local check which applies to all commands in this cog.
@@ -134,6 +314,17 @@ class MusicBot(commands.Cog):
 
         return player
 
+    def stats(self):
+        # Runtime statistics of the bot, used to monitor its performance
+        return {'players': len(self.players), 'hibernated': len(self.snapshots),
+                'hibernation': self.hibernation.stats(), 'cache': trackCache.stats(), 'index': trackIndex.stats(),
+                'audio_cache': audioCache.stats(), 'extractor': ytdl.stats(),
+                'rate_limits': rateLimits.stats(), 'snapshots': self.snapshots.stats(),
+                'startup': startupProfile.stats(),
+                'loudness': loudness.stats() if config.LOUDNESS_NORMALIZE else None,
+                'shared_audio': sharedAudio.stats() if config.SHARED_AUDIO else None, 'loop_lag': self.watchdog.stats() if self.watchdog is not None else None,
+                'stages': registry.stats()}
+
     def embedAddField(self,embed : discord.Embed,name:str,value:str,inline:bool=False):
         embed.add_field(name=name,value=value,inline=inline)
 
@@ -164,14 +355,16 @@ class MusicBot(commands.Cog):
                 return
 
             try:
-                await vc.move_to(channel)
+                with registry.timer('voice_connect_seconds', kind='move'):
+                    await vc.move_to(channel)
 
             except asyncio.TimeoutError:
                 raise VoiceConnectionError(f'Moving to channel: <{channel}> timed out.')
 
         else:
             try:
-                await channel.connect()
+                with registry.timer('voice_connect_seconds', kind='connect'):
+                    await channel.connect()
             except asyncio.TimeoutError:
                 raise VoiceConnectionError(f'Connecting to channel: <{channel}> timed out.')
 
@@ -194,23 +387,33 @@ class MusicBot(commands.Cog):
             await ctx.invoke(self.connect)
 
         player = self.get_player(ctx)
+        if not player.current and player.queue.empty():
+            # The time to the first audio of the idle player is measured from this command
+            player.requested_at = ctx.started
 
-        # Converting the multi word search request from tuple to a single string
-        s = ''
-        for _ in search:
-            s += _ + ' '
+        if YTDLSource.is_playlist(search):
+            # Every song of the playlist is queued after a single flat extraction
+            title, tracks = await YTDLSource.create_playlist(ctx, search, loop=self.bot.loop)
+            for track in tracks:
+                player.queue.put(track)
+            player.prefetcher.refresh()
 
-        search = s
+            await ctx.send(embed=customEmbed(
+                f"**`{ctx.author}: Added`** **{len(tracks)}** songs from **[{title}]({search.strip()})** to the Queue."))
+            return
 
-        # If download is False, sources will be a dict which will be used later to regather the stream.
+        # If download is False, sources will be a Track which will be used later to regather the stream.
         # If download is True, sources will be a discord.FFmpegPCMAudio with a VolumeTransformer.
 
         source = await YTDLSource.create_source(ctx, search, loop=self.bot.loop, download=False)
+
+        # The loudness of the song is measured while it waits in the queue
+        YTDLSource.measure(source)
         if player.current:
-            await ctx.send(
-            embed=customEmbed(f"**`{ctx.author}: Added`** **[{source['title']}]({source['webpage_url']}) to the Queue.]**"))
-        player.playlist.append(source['title'])
-        await player.queue.put(source)
+            # A burst of added songs is announced by a single message
+            outbox_for(ctx.channel, self.bot.loop).added(ctx.author, source.title, source.webpage_url)
+        player.queue.put(source)
+        player.prefetcher.refresh()
 
     @commands.command(name='pause', pass_context=True)
     async def pause(self, ctx):
@@ -254,15 +457,47 @@ class MusicBot(commands.Cog):
         elif not vc.is_playing():
             return
 
-        self.get_player(ctx).playlist.remove(vc.source['title'])
+        if isinstance(vc.source, TrackSource):
+            # A skipped song is not resumed by the player
+            vc.source.skipped = True
+
         vc.stop()
         await ctx.send(embed=customEmbed(f'**`{ctx.author}`**: Skipped the song!'))
         return
 
+    @commands.command(name='seek', pass_context=True)
+    async def seek(self, ctx, *, position: str):
+        # Continues the current song at the given time, like 1:30, or moves it by +10 or -10 seconds
+        vc = ctx.voice_client
+
+        if not vc or not vc.is_connected() or not isinstance(vc.source, TrackSource):
+            return await ctx.send(embed=botNotPlaying, delete_after=20)
+
+        parsed = parseTime(position)
+        if parsed is None:
+            return await ctx.send(embed=customEmbed('Please enter the time like 90, 1:30, +10 or -10.'))
+
+        seconds, sign = parsed
+        source = vc.source
+        if sign:
+            seconds = source.position + seconds if sign == '+' else source.position - seconds
+        seconds = max(seconds, 0)
+
+        duration = source.track.duration
+        if duration and seconds >= duration:
+            return await ctx.send(embed=customEmbed(f'The song is only **{formatTime(duration)}** long.'))
+
+        # The player opens the saved stream link again at the new second once the current ffmpeg process stopped
+        player = self.get_player(ctx)
+        player.seek_to = seconds
+        vc.stop()
+        await ctx.send(embed=customEmbed(f'**`{ctx.author}`**: Moved the song to **{formatTime(seconds)}**'))
+
 
     @commands.command(name='queue', aliases=['q'], pass_context=True)
-    async def queue_info(self, ctx):
+    async def queue_info(self, ctx, page: int = 1):
         # Retrieve a basic queue of upcoming songs.
+        # page selects which 15 songs of the queue are shown
         vc = ctx.voice_client
 
         if not vc or not vc.is_connected():
@@ -272,17 +507,19 @@ class MusicBot(commands.Cog):
         if player.queue.empty():
             return await ctx.send(embed=customEmbed(description=f'There are currently no more queued songs'))
 
-        # Grab up to 10 entries from the queue
-        upcoming = list(itertools.islice(player.queue._queue, 0, 15))
+        # Grab up to 15 entries of the requested page from the queue
+        pages = (len(player.queue) + 14) // 15
+        page = min(max(page, 1), pages)
+        upcoming = player.queue.slice((page - 1) * 15, page * 15)
 
         queueList = discord.Embed(
-            title=f'Upcoming - Total {player.queue.qsize()}',
+            title=f'Upcoming - Total {len(player.queue)}',
             colour=discord.Colour.blue()
         )
-        for _,i in zip(upcoming,range(1,len(upcoming))):
-            queueList.add_field(name=i,value=f"**[{_['title']}]**({_['webpage_url']})",inline=True)
+        for i,_ in enumerate(upcoming,start=(page - 1) * 15 + 1):
+            queueList.add_field(name=i,value=f"**[{_.title}]**({_.webpage_url})",inline=True)
         queueList.set_author(name=ctx.message.author,icon_url=ctx.message.author.avatar_url)
-        queueList.set_footer(text=f'If you want to see the complete queue use {self.cmdPrefix}queueall')
+        queueList.set_footer(text=f'Page {page} of {pages}, use {self.cmdPrefix}queue <page> to see the other pages')
         await ctx.send(embed=queueList)
 
     @commands.command(name='now_playing', aliases=['np', 'current', 'playing'], pass_context=True)
@@ -297,17 +534,15 @@ class MusicBot(commands.Cog):
         if not player.current:
             return await ctx.send(embed=botNotPlaying)
 
-        try:
-            # Removing our previous now_playing message
-            await player.np.delete()
-
-        except HTTPException:
-            pass
+        embed = customEmbed(
+            description=f"**Now Playing:** **[{vc.source.title}]**({vc.source.web_url})"
+                        f"requested by **[{vc.source.track.requester(ctx.guild)}]**"
+        )
+        if ctx.channel.id != player._channel.id:
+            return await ctx.send(embed=embed)
 
-        player.np = await ctx.send(embed=customEmbed(
-            description=f"**Now Playing:** **[{vc.source['title']}]**({vc.source['webpage_url']})"
-                        f"requested by **[{vc.source['requester']}]**"
-        ))
+        # Our previous now_playing message is removed and sent again at the bottom of the channel
+        await player.outbox.replace('now_playing', embed)
 
     @commands.command(name='volume', aliases=['vol'], pass_context=True)
     async def change_volume(self, ctx, *, vol: float):
@@ -325,9 +560,13 @@ class MusicBot(commands.Cog):
         player = self.get_player(ctx)
 
         if vc.source:
-            vc.source.volume = vol // 100
+            vc.source.volume = vol / 100
+
+        player.volume = vol / 100
 
-        player.volume = vol // 100
+        if vc.source and not getattr(vc.source, 'live_volume', True):
+            return await ctx.send(embed=customEmbed(f'**{ctx.author}]**: Set the volume to **{vol}%**, '
+                                                    f'it applies from the next song'))
 
         await ctx.send(embed=customEmbed(f'**{ctx.author}]**: Set the volume to **{vol}%**'))
 
@@ -355,48 +594,81 @@ class MusicBot(commands.Cog):
         if not vc:
             await ctx.invoke(self.connect)
 
-        fileUrl = ctx.message.attachments[0].url
-        if fileUrl is None:
-            if os.path.exists(f'currentPlaylist/{ctx.guild.id}.txt'):
-                pass
-            else:
-                await ctx.send('No file has been attached to the message.')
+        path = f'currentPlaylist/{ctx.guild.id}.txt'
+        if ctx.message.attachments:
+            attachment = ctx.message.attachments[0]
+            if attachment.size > config.PLAYALL_MAX_BYTES:
+                await ctx.send(embed=customEmbed(
+                    f'The playlist file is too large, the limit is {config.PLAYALL_MAX_BYTES // 1024} KB.'))
+                return
+
+            lines = attachment_lines(attachment, loop=self.bot.loop,
+                                     save_path=path if config.PLAYALL_SAVE_COPY else None)
+
+        elif os.path.exists(path):
+            lines = file_lines(path, loop=self.bot.loop)
+
         else:
-            file = requests.get(fileUrl)
-            with open(f'currentPlaylist/{ctx.guild.id}.txt', 'wb') as wp:
-                wp.write(file.content)
+            await ctx.send('No file has been attached to the message.')
+            return
 
         player = self.get_player(ctx)
-        with open(f'currentPlaylist/{ctx.guild.id}.txt', 'r') as sg:
-            for search in sg:
-
-                source = await YTDLSource.create_source(ctx, search, loop=self.bot.loop, download=False)
-                await ctx.send(
-                    embed=customEmbed(
-                        f"{ctx.author.mention}: Added [{source['title']}]({source['webpage_url']}) to the Queue.]"))
-                player.playlist.append(source['title'])
-                if player.queue.empty():
-                    await player.queue.put(source)
-                    await asyncio.sleep(1)
-                else:
-                    await player.queue.put(source)
+        await PlaylistImport(ctx, player).run(lines)
 
 
     @commands.command(name='shuffle', pass_context=True)
     async def shuffle(self, ctx):
-        # This shuffle the play queue using the random library
+        # This shuffle the play queue in place, the entries keep their ids
         player = self.get_player(ctx)
-        shuffle(player.queue._queue)
+        player.queue.shuffle()
+        player.prefetcher.refresh()
         await ctx.send(embed=customEmbed(f'{ctx.author.mention}: The queue has been shuffled.'))
         return
 
     @commands.command(name='clear',pass_context=True)
     async def clear(self,ctx):
         player = self.get_player(ctx)
-        player.queue = asyncio.Queue()
-        player.playlist =[]
+        player.queue.clear()
+        player.prefetcher.clear()
         await ctx.send(embed= customEmbed(f"{ctx.author.mention}: Cleared the queue. "))
 
+    @commands.command(name='stats', pass_context=True)
+    @commands.is_owner()
+    async def stats_info(self, ctx):
+        # This displays the runtime statistics of the bot to its owner
+        stats = self.stats()
+        embed = discord.Embed(title='Bot statistics', colour=discord.Colour.blue())
+
+        lag = stats['loop_lag']
+        if lag is None:
+            self.embedAddField(embed, name='Event loop lag', value='The watchdog is disabled, set LOOP_WATCHDOG=1')
+        else:
+            self.embedAddField(embed, name='Event loop lag',
+                               value=f"p50 {lag['p50'] * 1000:.1f}ms, p99 {lag['p99'] * 1000:.1f}ms, "
+                                     f"max {lag['max'] * 1000:.1f}ms, {lag['stalls']} stalls")
+
+        cache = stats['cache']
+        extractor = stats['extractor']
+        self.embedAddField(embed, name='Players', value=f"{stats['players']} live, {stats['hibernated']} hibernated",
+                           inline=True)
+        self.embedAddField(embed, name='Search cache', value=f"{cache['hits']} hits, {cache['misses']} misses",
+                           inline=True)
+        self.embedAddField(embed, name='Extractor', value=f"{extractor['running']} running, "
+                                                         f"{extractor['queued_interactive'] + extractor['queued_bulk']} "
+                                                         f"queued, {extractor['wait_avg'] * 1000:.0f}ms average wait",
+                           inline=True)
+        self.embedAddField(embed, name='Rate limits', value=f"{stats['rate_limits']['rate_limited']} hits, "
+                                                           f"{stats['rate_limits']['cooling_channels']} channels cooling down",
+                           inline=True)
+
+        buffer = bufferStats(ctx.guild.id)
+        if buffer['jitter'] is not None:
+            self.embedAddField(embed, name='Audio buffer of this server',
+                               value=f"{buffer['underruns']} underruns, "
+                                     f"{buffer['depth']['avg'] * 1000:.0f}ms average depth, "
+                                     f"p99 jitter {buffer['jitter']['p99'] * 1000:.1f}ms")
+        await ctx.send(embed=embed)
+
     @commands.command(pass_context=True)
     async def hello(self, ctx):
         await ctx.send(f'Hello! {ctx.author}')
@@ -414,17 +686,19 @@ class MusicBot(commands.Cog):
             )
 
         if cmd is None:
-            self.embedAddField(embed,name='Music Commands',value='play, queue, q, pause, resume, playall, shuffle, volume, vol, current, playing, np, skip, next')
+            self.embedAddField(embed,name='Music Commands',value='play, queue, q, pause, resume, playall, shuffle, volume, vol, current, playing, np, skip, next, seek')
             self.embedAddField(embed,name='Additional commands',value='echo, hello, ping, help')
             embed.set_footer(text=f'use {self.cmdPrefix}help <command> for better description')
 
 
         elif cmd == "play":
             self.embedAddField(embed,name="Play Command",value=f'{self.cmdPrefix}play <name or url>\n'
-                                                      'It will play the requested song or else add it to the queue')
+                                                      'It will play the requested song or else add it to the queue\n'
+                                                      'A playlist link adds the songs of the playlist')
 
         elif cmd in ["queue","q"]:
-            self.embedAddField(embed,name="Queue command",value=f"{self.cmdPrefix}{cmd}")
+            self.embedAddField(embed,name="Queue command",value=f"{self.cmdPrefix}{cmd} <page>\n"
+                                                               f"It will show a page of the upcoming songs.")
 
         elif cmd == "pause":
             self.embedAddField(embed,name='Pause Command',value=f'{self.cmdPrefix}pause\n'
@@ -439,6 +713,11 @@ class MusicBot(commands.Cog):
                                'Add a file and in optional comments add this command to load the songs in the file\n'
                                'The file which been attached must be a text file and a song name in a line.')
 
+        elif cmd == "seek":
+            self.embedAddField(embed,name='Seek Command',value=f'{self.cmdPrefix}seek <time>\n'
+                               'It will continue the current song at the given time like 1:30, +10 moves it forward '
+                               'and -10 moves it back by 10 seconds.')
+
         elif cmd == "shuffle":
             self.embedAddField(embed,name='Shuffle Command',value=f'{self.cmdPrefix}shuffle\n'
                                'It will shuffle the current queue list.')
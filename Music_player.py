@@ -11,19 +11,39 @@ import asyncio
 from async_timeout import timeout
 
 # This is used to call upon the YTDLsource class
-from Song import YTDLSource
+from song import YTDLSource, TrackSource, ytdl
+
+# This is the compact record of the queued songs
+from track import Track
+
+# This is used to count the plays of the songs kept on the disk
+from audio_cache import audioCache
+
+# This is used to prepare the upcoming songs while the current song plays
+from prefetch import Prefetcher
+
+# This is used to keep the songs of the guild in order
+from track_queue import TrackQueue
+
+# This is used to send the now playing message without using up the rate limits of the channel
+from outbox import outbox_for
+
+# This import brings in the resume and hibernation settings
+import config
+
+# This is used to record the time spent in each stage of the playback
+import time
+from metrics import registry
 
 # This function will let us to get the required voice client of the bot.
 from discord.utils import get
 
-# This exception class is imported to aid us in finding whether the song is playing or completed
-from discord import HTTPException
-
 
 class MusicPlayer:
     # Instance of this class will be destroyed if the bot leaves the voice channel
 
-    __slots__ = ('bot', '_guild', '_channel', '_cog', 'queue', 'next', 'current', 'np', 'volume', 'playlist')
+    __slots__ = ('bot', '_guild', '_channel', '_cog', 'queue', 'next', 'current', 'volume', 'prefetcher',
+                 'requested_at', 'ended_at', 'seek_to', 'resume', 'task')
 
     def __init__(self, ctx):
         self.bot = ctx.bot
@@ -31,18 +51,32 @@ class MusicPlayer:
         self._channel = ctx.channel
         self._cog = ctx.cog
 
-        self.playlist = []
-        self.queue = asyncio.Queue()
+        self.queue = TrackQueue()
         self.next = asyncio.Event()
+        self.prefetcher = Prefetcher(self)
 
-        self.np = None  # Now playing message
         self.volume = .5
         self.current = None
 
-        ctx.bot.loop.create_task(self.player_loop())
+        self.requested_at = None  # When a play command was sent to the idle player
+        self.ended_at = None  # When the previous song ended
+
+        self.seek_to = None  # Second the current song is opened at by the seek command
+        self.resume = None  # The song which was playing before the restart and the second it continues at
+
+        # Cancelled by the cog when the player is hibernated or destroyed
+        self.task = ctx.bot.loop.create_task(self.player_loop())
+
+    @property
+    def outbox(self):
+        # The informational messages of the player, the now playing message is kept under the 'now_playing' key
+        return outbox_for(self._channel, self.bot.loop)
 
     async def player_loop(self):
         # This will be the main audio player for the bot in specific server/guild
+        if self._cog.watchdog is not None:
+            self._cog.watchdog.label('player_loop', self._guild.id)
+
         await self.bot.wait_until_ready()
 
         while not self.bot.is_closed():
@@ -50,24 +84,41 @@ class MusicPlayer:
 
             try:
                 # Wait for the next song.
-                # If we timeout cancel the player and disconnect from the voice client
-                async with timeout(300):
+                # If we timeout the player is hibernated and disconnects from the voice client
+                async with timeout(config.HIBERNATE_IDLE):
                     # It will await till the user enters another song
+                    waiting = self.queue.empty()
                     source = await self.queue.get()
-                    if source['title'] not in self.playlist:
-                        continue
 
             except asyncio.TimeoutError:
                 # Destroys the player of the specific guild
                 return self.destroy(self._guild)
 
-            if not isinstance(source, YTDLSource):
+            entry = source
+            start = 0
+            if self.resume is not None and self.resume[0] is entry:
+                start = self.resume[1]
+                self.resume = None
+
+            prefetched = await self.prefetcher.take(entry)
+            if prefetched is not None and (start or not prefetched.live_volume and prefetched.volume != self.volume):
+                # The prefetched source starts at the beginning of the song and
+                # the volume of an opus source is fixed when ffmpeg starts, so it is opened again
+                prefetched.cleanup()
+                prefetched = None
+
+            if prefetched is not None:
+                source = prefetched
+
+            elif not isinstance(source, TrackSource):
                 # If the source was a probably a stream then,
-                # the stream must be regathered to prevent stream expiration
+                # the stream link resolved while queueing is reused unless it has expired
                 try:
-                    source = await YTDLSource.regather_stream(source, loop=self.bot.loop)
+                    with registry.timer('regather_seconds'):
+                        source = await YTDLSource.regather_stream(source, loop=self.bot.loop, guild=self._guild.id,
+                                                                  volume=self.volume, start=start)
                 except Exception as e:
-                    await self._channel.send(f'There was an error processing your song.\n'f'```css\n[{e}]\n```')
+                    self.outbox.post(f'There was an error processing your song.\n'f'```css\n[{e}]\n```')
 
                     continue
 
@@ -75,24 +126,90 @@ class MusicPlayer:
             self.current = source
             voice = get(self.bot.voice_clients, guild=self._guild)
 
+            source.wait_started = self.requested_at if waiting else None
+            source.gap_started = None if waiting else self.ended_at
+            source.play_started = time.monotonic()
+            self.requested_at = None
+
             voice.play(source, after=lambda _: self.bot.loop.call_soon_threadsafe(self.next.set))
-            self.np = await self._channel.send(embed=discord.Embed(description=f'**Now Playing:** **[{source.title}]**({source.web_url}) '
-                                                                               f'requested by'f'**[{source.requester}]**'))
-            self.playlist.remove(source['title'])
+            self.prefetcher.refresh()
+            if isinstance(entry, Track):
+                audioCache.record_play(entry, ytdl)
+            # The now playing message of the previous song is edited
+            self.outbox.update('now_playing', discord.Embed(description=f'**Now Playing:** **[{source.title}]**({source.web_url}) '
+                                                                        f'requested by'f'**[{source.track.requester(self._guild)}]**'))
 
             await self.next.wait()
 
             # Making sure the FFmpeg process is cleaned up.
             source.cleanup()
-            self.current = None
 
-            try:
-                # We are no longer playing this song
-                await self.np.delete()
+            # The song is opened again at the right second if it was seeked or its stream broke before the end
+            attempts = 0
+            while isinstance(entry, Track):
+                start, reason = self.restart_at(source, voice, attempts)
+                if start is None:
+                    break
+
+                registry.inc('stream_reopens_total', reason=reason)
+                attempts += reason == 'broken'
+                source = await self.reopen_stream(entry, voice, start=start, fresh=reason == 'expired')
+                if source is None:
+                    break
+                source.cleanup()
+
+            # The gap to the next song starts once the song and its reopened streams have ended
+            self.ended_at = time.monotonic()
+            self.current = None
 
-            except HTTPException:
-                pass
+            if self.queue.empty():
+                # We are no longer playing anything
+                self.outbox.discard('now_playing')
+
+    def restart_at(self, source, voice, attempts):
+        # Returns the second the song continues at and the reason, or None if the song ended
+        if self.seek_to is not None:
+            start, self.seek_to = self.seek_to, None
+            return start, 'seek'
+
+        if source.skipped or self.bot.is_closed() or not voice.is_connected():
+            return None, None
+
+        if not source.frames:
+            # FFmpeg could not open the saved stream link, so the song is extracted once more
+            if not source.reused_stream:
+                return None, None
+            return source.start, 'expired'
+
+        duration = source.track.duration
+        if duration and source.position < duration - config.STREAM_RESUME_MARGIN \
+                and attempts < config.STREAM_RESUME_ATTEMPTS:
+            # The stream broke in the middle of the song, the saved link is opened at the last second played
+            return source.position, 'broken'
+
+        return None, None
+
+    async def reopen_stream(self, entry, voice, *, start=0, fresh=False):
+        # Plays the song again from the start second, fresh extracts the song once more
+        if fresh:
+            YTDLSource.invalidate(entry)
+        try:
+            source = await YTDLSource.regather_stream(entry, loop=self.bot.loop, fresh=fresh, guild=self._guild.id,
+                                                      volume=self.volume, start=start)
+        except Exception as e:
+            self.outbox.post(f'There was an error processing your song.\n'f'```css\n[{e}]\n```')
+            return None
+
+        source.volume = self.volume
+        self.current = source
+        self.next.clear()
+
+        voice.play(source, after=lambda _: self.bot.loop.call_soon_threadsafe(self.next.set))
+        await self.next.wait()
+        return source
 
     def destroy(self, guild):
         # The bot will disconnect from the voice client and cleanup the player data
-        return self.bot.loop.create_task(self._cog.cleanup(guild))
+        # It is counted as a hibernation, an idle player has no songs to keep
+        self.prefetcher.clear()
+        return self.bot.loop.create_task(self._cog.hibernate(guild, 'idle'))
@@ -0,0 +1,193 @@
+# This class keeps the songs which are played often on the disk
+# A song played from the disk needs no extraction and its link can never expire
+
+# This is used to implement the asynchronous operations like the background downloads
+import asyncio
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to keep the files in the least recently played order
+from collections import OrderedDict
+
+# This is used to download the songs outside of the extractor workers
+from concurrent.futures import ThreadPoolExecutor
+
+# This import brings in the audio cache settings
+import config
+
+# This is used to time the downloads
+from metrics import registry
+
+# Number of songs whose play count is remembered
+PLAY_COUNTS = 10000
+
+
+def video_id(filename):
+    # The files are named <extractor>-<video id>.<ext> by the outtmpl of song.py
+    name = os.path.splitext(filename)[0]
+    return name.split('-', 1)[1] if '-' in name else None
+
+
+class AudioCache:
+    # A single instance of this class is shared by every guild
+
+    __slots__ = ('directory', 'max_bytes', 'min_plays', 'max_duration', 'bytes', 'hits', 'misses', 'downloads',
+                 'evictions', '_files', '_plays', '_downloading', '_loaded', '_executor')
+
+    def __init__(self, directory=None, max_bytes=None, min_plays=None, max_duration=None):
+        self.directory = config.AUDIO_CACHE_DIR if directory is None else directory
+        self.max_bytes = config.AUDIO_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.min_plays = config.AUDIO_CACHE_MIN_PLAYS if min_plays is None else min_plays
+        self.max_duration = config.AUDIO_CACHE_MAX_DURATION if max_duration is None else max_duration
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.evictions = 0
+
+        self._files = OrderedDict()  # video id -> (path, size)
+        self._plays = OrderedDict()  # video id -> play count
+        self._downloading = set()
+        self._loaded = None
+        self._executor = ThreadPoolExecutor(max_workers=config.AUDIO_CACHE_DOWNLOADS, thread_name_prefix='download')
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _scan(self):
+        # Runs in the executor, the files are ordered by their last access time
+        files = []
+        os.makedirs(self.directory, exist_ok=True)
+        for entry in os.scandir(self.directory):
+            key = video_id(entry.name)
+            if key and entry.is_file() and not entry.name.endswith('.part'):
+                stat = entry.stat()
+                files.append((stat.st_atime, key, entry.path, stat.st_size))
+
+        return sorted(files)
+
+    async def load(self):
+        # The files downloaded before the restart are picked up once in the background
+        if self._loaded is None:
+            self._loaded = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._loaded)
+
+    async def _load(self):
+        loop = asyncio.get_event_loop()
+        for _, key, path, size in await loop.run_in_executor(None, self._scan):
+            self._add(key, path, size)
+        await self._evict()
+
+    def _add(self, key, path, size):
+        old = self._files.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+
+        self._files[key] = (path, size)
+        self.bytes += size
+
+    def __contains__(self, key):
+        return self.enabled and key in self._files
+
+    def use_shard(self, shard_id, shard_count):
+        # Every shard keeps its files in its own directory and gets an even share of the byte budget,
+        # so the eviction of one shard never removes a file another shard is playing
+        if shard_id is None or self._loaded is not None:
+            return
+
+        self.directory = os.path.join(self.directory, f'shard{shard_id}')
+        self.max_bytes //= max(shard_count or 1, 1)
+
+    def discard(self, key):
+        # Forgets a file which could not be played, it is downloaded again once the song is played often
+        entry = self._files.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def peek(self, key):
+        # Returns the local file of the video without counting a hit or a miss or refreshing its order
+        if not self.enabled or key is None:
+            return None
+        entry = self._files.get(key)
+        return entry[0] if entry is not None else None
+
+    def path(self, key):
+        # Returns the local file of the video if it is cached
+        if not self.enabled or key is None:
+            return None
+
+        try:
+            path, size = self._files[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._files.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def record_play(self, track, ytdl):
+        # Counts the plays of the song and downloads it in the background once it is played often
+        key = track.video_id
+        if not self.enabled or key is None:
+            return
+
+        if self._loaded is None:
+            asyncio.ensure_future(self.load())
+
+        plays = self._plays.pop(key, 0) + 1
+        self._plays[key] = plays
+        if len(self._plays) > PLAY_COUNTS:
+            self._plays.popitem(last=False)
+
+        # Live streams and songs of unknown length could download forever, they are always streamed
+        duration = track.duration
+        if (plays >= self.min_plays and key not in self._files and key not in self._downloading
+                and duration and duration <= self.max_duration):
+            self._downloading.add(key)
+            asyncio.ensure_future(self._download(key, track.webpage_url, ytdl))
+
+    async def _download(self, key, url, ytdl):
+        loop = asyncio.get_event_loop()
+        try:
+            with registry.timer('extract_seconds', kind='download'):
+                _, path = await loop.run_in_executor(self._executor, ytdl.download, url)
+            size = await loop.run_in_executor(None, os.path.getsize, path)
+
+        except Exception:
+            # The song is simply streamed if it could not be downloaded
+            return
+
+        finally:
+            self._downloading.discard(key)
+
+        self.downloads += 1
+        self._add(key, path, size)
+        await self._evict()
+
+    async def _evict(self):
+        # Removes the least recently played files until the cache is within its byte budget
+        loop = asyncio.get_event_loop()
+        removed = []
+        while self.bytes > self.max_bytes and self._files:
+            key, (path, size) = self._files.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            removed.append(path)
+
+        for path in removed:
+            try:
+                await loop.run_in_executor(None, os.remove, path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'files': len(self._files), 'bytes': self.bytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'downloads': self.downloads, 'evictions': self.evictions}
+
+
+# The audio cache which is shared by every guild
+audioCache = AudioCache()
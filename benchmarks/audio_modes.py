@@ -0,0 +1,94 @@
+# This benchmark compares the CPU cost of one stream in the pcm and the opus audio modes
+# Usage: python benchmarks/audio_modes.py <audio file or stream link> [seconds]
+# The frames are read as fast as possible, the result is CPU seconds per minute of audio,
+# counting the python process and the ffmpeg process separately
+# The copy row is only meaningful when the input is an opus stream, like the webm audio of youtube
+
+# This import is used to read the command line arguments
+import sys
+
+# This import is used to find the modules of the bot
+import os
+
+# This import is used to measure the CPU time of the ffmpeg processes
+import resource
+
+# This import is used to measure the CPU time of the python process
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The frames are read in a tight loop, a read ahead buffer would hand out silent frames whenever it is empty
+os.environ['READAHEAD_SECONDS'] = '0'
+
+# This brings in the functionality of the discord library
+import discord
+
+# This is used to encode the pcm frames in the same way as the voice client does
+from discord.opus import Encoder
+
+from song import YTDLSource, YTDLOpusSource, ffmpegopts
+from track import Track
+
+# Length of a single audio frame in seconds
+FRAME_LENGTH = 0.02
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(name, open_source, encode, seconds):
+    frames = int(seconds / FRAME_LENGTH)
+    encoder = Encoder() if encode else None
+
+    children_before = children_cpu()
+    python_before = time.process_time()
+
+    source = open_source()
+    read = 0
+    while read < frames:
+        data = source.read()
+        if not data:
+            break
+        if encoder is not None:
+            # The voice client encodes every frame of a source which is not opus
+            encoder.encode(data, Encoder.SAMPLES_PER_FRAME)
+        read += 1
+
+    source.cleanup()
+
+    python_cpu = time.process_time() - python_before
+    ffmpeg_cpu = children_cpu() - children_before
+    minutes = read * FRAME_LENGTH / 60 or 1
+
+    print(f'{name:>5}: {read} frames, python {python_cpu / minutes:.3f}s, ffmpeg {ffmpeg_cpu / minutes:.3f}s, '
+          f'total {(python_cpu + ffmpeg_cpu) / minutes:.3f}s CPU per minute of audio')
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python benchmarks/audio_modes.py <audio file or stream link> [seconds]')
+        return
+
+    url = sys.argv[1]
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    track = Track('benchmark', 'benchmark', url)
+    opus_track = Track('benchmark', 'benchmark', url, acodec='opus')
+
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+
+    def open_pcm():
+        source = YTDLSource(discord.FFmpegPCMAudio(url, **ffmpegopts), track=track)
+        source.volume = .5
+        return source
+
+    measure('pcm', open_pcm, True, seconds)
+    measure('opus', lambda: YTDLOpusSource(url, track=track, volume=.5), False, seconds)
+    measure('copy', lambda: YTDLOpusSource(url, track=opus_track, volume=1.0), False, seconds)
+
+
+if __name__ == '__main__':
+    main()
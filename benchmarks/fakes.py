@@ -0,0 +1,322 @@
+# Stand ins for youtube_dl, ffmpeg and the discord objects used by the load test
+# They let MusicBot and MusicPlayer run without discord or youtube
+
+# This is used to give every fake song a stable id
+import hashlib
+
+# This is used to simulate the latency and the failures of the extractor
+import random
+
+# This is used to consume the audio frames at the real time pace
+import threading
+
+# This is used to simulate the latency of the extractor
+import time
+
+# This brings in the audio source class which the fake ffmpeg source extends
+import discord
+
+# Length of a single audio frame in seconds and the size of a 20ms stereo pcm frame
+FRAME_LENGTH = 0.02
+PCM_FRAME = b'\0' * 3840
+
+
+class ExtractorSettings:
+    # The latency in seconds, the failure rate between 0 and 1, and the length of every fake song in seconds
+    # drop_rate is the chance a stream breaks at a random second of the song
+    latency = 0.5
+    jitter = 0.2
+    failure_rate = 0.0
+    drop_rate = 0.0
+    track_length = 30.0
+    playlist_length = 50
+
+
+class FakeYoutubeDL:
+    # Returns made up songs after sleeping for the configured latency, like youtube_dl.YoutubeDL
+
+    def __init__(self, options):
+        self.options = options
+
+    def extract_info(self, url, download=False):
+        time.sleep(max(random.gauss(ExtractorSettings.latency, ExtractorSettings.jitter), 0))
+        if random.random() < ExtractorSettings.failure_rate:
+            raise RuntimeError(f'fake extraction of {url} failed')
+
+        if self.options.get('extract_flat'):
+            return {'title': f'playlist {url}', 'entries': [
+                {'ie_key': 'Youtube', 'id': self._id(f'{url}#{i}'), 'url': self._id(f'{url}#{i}'),
+                 'title': f'{url} song {i}', 'duration': ExtractorSettings.track_length}
+                for i in range(ExtractorSettings.playlist_length)]}
+
+        video_id = url.rsplit('=', 1)[1] if 'watch?v=' in url else self._id(url)
+        return {'id': video_id, 'title': f'song {video_id}', 'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+                'url': f'fake://{video_id}?expire={int(time.time()) + 6 * 60 * 60}',
+                'duration': ExtractorSettings.track_length, 'acodec': 'opus', 'ext': 'webm', 'extractor': 'youtube'}
+
+    @staticmethod
+    def _id(text):
+        return hashlib.sha1(text.encode()).hexdigest()[:11]
+
+    def prepare_filename(self, data):
+        return f"downloads/{data['extractor']}-{data['id']}.{data['ext']}"
+
+
+class FakeFFmpegAudio(discord.AudioSource):
+    # Replaces discord.FFmpegPCMAudio, it produces silent frames for the length of the fake song
+
+    def __init__(self, source, *, before_options='', options=''):
+        self.source = source
+
+        # The song starts at the second given to -ss like ffmpeg does
+        args = before_options.split()
+        start = float(args[args.index('-ss') + 1]) if '-ss' in args else 0.0
+        length = ExtractorSettings.track_length - start
+        if random.random() < ExtractorSettings.drop_rate:
+            length = random.uniform(0, length)
+        self.remaining = int(length / FRAME_LENGTH)
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return PCM_FRAME
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.remaining = 0
+
+
+class FakeVoiceClient:
+    # Reads a frame of the playing source every 20ms on its own thread, like discord.VoiceClient
+
+    def __init__(self, bot, guild, channel):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.loop = bot.loop
+        self.source = None
+        self.frames = 0
+        self.late_frames = 0
+
+        self._connected = True
+        self._paused = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._thread is not None and not self._stopped.is_set() and not self._paused.is_set()
+
+    def is_paused(self):
+        return self._paused.is_set()
+
+    def play(self, source, *, after=None):
+        if self.is_playing():
+            raise RuntimeError('Already playing audio.')
+
+        self.source = source
+        self._stopped.clear()
+        self._paused.clear()
+        self._thread = threading.Thread(target=self._run, args=(source, after), daemon=True)
+        self._thread.start()
+
+    def _run(self, source, after):
+        next_frame = time.perf_counter()
+        while not self._stopped.is_set():
+            if self._paused.is_set():
+                time.sleep(FRAME_LENGTH)
+                next_frame = time.perf_counter()
+                continue
+
+            if not source.read():
+                # Like discord's AudioPlayer the client stops playing before the after callback runs
+                self._stopped.set()
+                break
+            self.frames += 1
+
+            next_frame += FRAME_LENGTH
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_frames += 1
+
+        if after is not None:
+            try:
+                after(None)
+            except Exception:
+                # discord.py only logs the errors of the after callback as well
+                pass
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def stop(self):
+        self._stopped.set()
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    def join(self):
+        # Waits for the audio thread to finish, used when the load test ends
+        if self._thread is not None:
+            self._thread.join()
+
+    async def disconnect(self, *, force=False):
+        self.stop()
+        self._connected = False
+        self.guild.voice_client = None
+        if self in self.bot.voice_clients:
+            self.bot.voice_clients.remove(self)
+
+
+class FakeMessage:
+
+    def __init__(self, channel, content=None, embed=None):
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, *, content=None, embed=None):
+        self.content = content or self.content
+        self.embed = embed or self.embed
+
+    async def delete(self, *, delay=None):
+        pass
+
+
+class FakeTextChannel:
+
+    def __init__(self, channel_id, sends):
+        self.id = channel_id
+        self.sends = sends  # Counter shared by every channel
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        self.sends[0] += 1
+        return FakeMessage(self, content, embed)
+
+    async def trigger_typing(self):
+        pass
+
+
+class FakeVoiceChannel:
+
+    def __init__(self, bot, guild, channel_id):
+        self.bot = bot
+        self.guild = guild
+        self.id = channel_id
+
+    async def connect(self, **kwargs):
+        voice = FakeVoiceClient(self.bot, self.guild, self)
+        self.guild.voice_client = voice
+        self.bot.voice_clients.append(voice)
+        return voice
+
+    @property
+    def members(self):
+        return [member for member in self.guild.members.values() if member.voice.channel is self]
+
+    def __str__(self):
+        return f'voice-{self.id}'
+
+
+class FakeVoiceState:
+
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeMember:
+
+    def __init__(self, member_id, channel):
+        self.id = member_id
+        self.name = f'user{member_id}'
+        self.mention = f'<@{member_id}>'
+        self.avatar_url = ''
+        self.bot = False
+        self.voice = FakeVoiceState(channel)
+
+    def __str__(self):
+        return f'{self.name}#0001'
+
+
+class FakeGuild:
+
+    def __init__(self, bot, guild_id, sends):
+        self.id = guild_id
+        self.voice_client = None
+        self.text_channel = FakeTextChannel(guild_id * 10, sends)
+        self.voice_channel = FakeVoiceChannel(bot, self, guild_id * 10 + 1)
+        self.members = {}
+
+    def member(self, member_id):
+        member = self.members.get(member_id)
+        if member is None:
+            member = self.members[member_id] = FakeMember(member_id, self.voice_channel)
+        return member
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id):
+        return {self.text_channel.id: self.text_channel, self.voice_channel.id: self.voice_channel}.get(channel_id)
+
+
+class FakeBot:
+    # Provides the parts of commands.Bot used by the cog and the players
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.voice_clients = []
+        self.guilds = []
+        self.latency = 0.05
+        self.shard_id = None
+        self.shard_count = None
+        self.closed = False
+
+    async def wait_until_ready(self):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeMessageData:
+
+    def __init__(self, author, attachments=()):
+        self.author = author
+        self.attachments = list(attachments)
+
+
+class FakeContext:
+    # Provides the parts of commands.Context used by the commands of the cog
+
+    def __init__(self, bot, cog, guild, author, command=None):
+        self.bot = bot
+        self.cog = cog
+        self.guild = guild
+        self.author = author
+        self.channel = guild.text_channel
+        self.message = FakeMessageData(author)
+        self.command = command
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, content=None, *, embed=None, delete_after=None):
+        return await self.channel.send(content, embed=embed, delete_after=delete_after)
+
+    async def trigger_typing(self):
+        pass
+
+    async def invoke(self, command, *args, **kwargs):
+        return await command.callback(self.cog, self, *args, **kwargs)
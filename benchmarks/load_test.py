@@ -0,0 +1,228 @@
+# This benchmark drives MusicBot and MusicPlayer for many guilds at once without discord or youtube
+# Usage: python benchmarks/load_test.py --guilds 200 --duration 60 [--output result.json]
+# Every guild keeps sending play, playall, skip, shuffle and queue commands against a fake extractor
+# with the configured latency and failure rate, and fake voice clients consume the audio at the real time pace
+# The report holds the throughput, time to first audio, inter track gap, event loop lag and memory,
+# so it can be compared between two runs
+
+# This is used to read the settings of the run
+import argparse
+
+# This is used to implement the asynchronous operations of the guild sessions
+import asyncio
+
+# This import is used to write the report
+import json
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to pick the commands and songs of the guilds
+import random
+
+# This import is used to find the modules of the bot
+import sys
+
+# This is used to run the bot in an empty directory
+import tempfile
+
+# This is used to measure the duration of the run
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+# The disk caches would carry songs from one run to the next, so they are disabled
+os.environ.update(INDEX_PATH='', SNAPSHOT_PATH='', AUDIO_CACHE_MAX_BYTES='0', AUDIO_MODE='pcm', LOOP_WATCHDOG='0',
+                  METRICS_PORT='0', METRICS_FILE='')
+
+# This brings in the functionality of the discord library
+import discord
+
+import fakes
+
+# The fake ffmpeg is installed before the bot opens any source
+discord.FFmpegPCMAudio = fakes.FakeFFmpegAudio
+
+# This is used to replace the youtube_dl instances of the bot with the fake extractor
+import song
+
+import BotCommands
+from metrics import registry
+from watchdog import LoopWatchdog
+
+# The commands of a guild session and how often they are sent
+COMMANDS = (('play', 60), ('queue', 15), ('skip', 10), ('shuffle', 10), ('playall', 5))
+
+# The attributes of the cog which hold the commands
+CALLBACKS = {'queue': 'queue_info', 'playall': 'playAll'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline load test of the music bot')
+    parser.add_argument('--guilds', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=60, help='seconds the guilds send commands')
+    parser.add_argument('--think', type=float, default=5, help='average seconds between two commands of a guild')
+    parser.add_argument('--latency', type=float, default=0.5, help='average seconds of a fake extraction')
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--failure-rate', type=float, default=0.02)
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='chance a stream breaks in the middle of a song')
+    parser.add_argument('--track-length', type=float, default=30, help='seconds of every fake song')
+    parser.add_argument('--catalog', type=int, default=2000, help='number of different songs searched for')
+    parser.add_argument('--playall-lines', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='file the json report is written to')
+    return parser.parse_args()
+
+
+def rss_bytes():
+    # The current resident memory of the process, the peak is used where /proc is missing
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoadTest:
+
+    def __init__(self, args):
+        self.args = args
+        self.commands = {name: 0 for name, _ in COMMANDS}
+        self.errors = 0
+        self.sends = [0]
+
+        names, weights = zip(*COMMANDS)
+        self.command_names = names
+        self.command_weights = weights
+
+        # A few songs are searched far more often than the rest, like the real charts
+        self.song_weights = [1 / (rank + 1) for rank in range(args.catalog)]
+
+    def search(self):
+        rank = random.choices(range(self.args.catalog), self.song_weights)[0]
+        return f'artist {rank} song {rank}'
+
+    async def command(self, cog, bot, guild, author, name):
+        command = getattr(cog, CALLBACKS.get(name, name))
+        ctx = fakes.FakeContext(bot, cog, guild, author, command)
+        kwargs = {'search': self.search()} if name == 'play' else {}
+
+        # Like discord.py the after hook runs even if the command failed
+        await cog.cog_before_invoke(ctx)
+        try:
+            await command.callback(cog, ctx, **kwargs)
+        except Exception:
+            self.errors += 1
+            return
+        else:
+            self.commands[name] += 1
+        finally:
+            await cog.cog_after_invoke(ctx)
+
+    async def session(self, cog, bot, guild, deadline):
+        author = guild.member(guild.id * 100 + 1)
+        await self.command(cog, bot, guild, author, 'play')
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(random.expovariate(1 / self.args.think))
+            name = random.choices(self.command_names, self.command_weights)[0]
+            await self.command(cog, bot, guild, author, name)
+
+    def write_playlists(self, guilds):
+        os.makedirs('currentPlaylist', exist_ok=True)
+        for guild in guilds:
+            with open(f'currentPlaylist/{guild.id}.txt', 'w') as wp:
+                wp.write('\n'.join(self.search() for _ in range(self.args.playall_lines)))
+
+    async def run(self):
+        args = self.args
+        loop = asyncio.get_event_loop()
+        fakes.ExtractorSettings.latency = args.latency
+        fakes.ExtractorSettings.jitter = args.jitter
+        fakes.ExtractorSettings.failure_rate = args.failure_rate
+        fakes.ExtractorSettings.drop_rate = args.drop_rate
+        fakes.ExtractorSettings.track_length = args.track_length
+        song.ytdl._factory = fakes.FakeYoutubeDL
+
+        bot = fakes.FakeBot(loop)
+        cog = BotCommands.MusicBot(bot, '$')
+        guilds = [fakes.FakeGuild(bot, guild_id, self.sends) for guild_id in range(1, args.guilds + 1)]
+        bot.guilds = guilds
+        self.write_playlists(guilds)
+
+        watchdog = LoopWatchdog(interval=0.05, threshold=0.1)
+        watchdog_task = loop.create_task(watchdog.run())
+
+        rss_before = rss_bytes()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(self.session(cog, bot, guild, deadline) for guild in guilds))
+        elapsed = time.monotonic() - started
+        rss_after = rss_bytes()
+
+        frames = sum(voice.frames for voice in bot.voice_clients)
+        late = sum(voice.late_frames for voice in bot.voice_clients)
+
+        bot.closed = True
+        watchdog.stop()
+        await watchdog_task
+        voices = list(bot.voice_clients)
+        for guild in guilds:
+            if guild.id in cog.players:
+                cog.players[guild.id].prefetcher.clear()
+            if guild.voice_client is not None:
+                await guild.voice_client.disconnect()
+        for voice in voices:
+            await loop.run_in_executor(None, voice.join)
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+        stages = registry.stats()
+        return {
+            'guilds': args.guilds,
+            'duration': elapsed,
+            'commands': self.commands,
+            'command_errors': self.errors,
+            'commands_per_second': sum(self.commands.values()) / elapsed,
+            'messages_sent': self.sends[0],
+            'frames_per_second': frames / elapsed,
+            'late_frame_ratio': late / frames if frames else 0.0,
+            'time_to_first_audio': stages.get('time_to_first_audio_seconds'),
+            'inter_track_gap': stages.get('inter_track_gap_seconds'),
+            'first_frame': stages.get('first_frame_seconds'),
+            'play_command': stages.get('command_seconds.play'),
+            'extract': stages.get('extract_seconds.info'),
+            'extractor_wait': stages.get('extractor_wait_seconds'),
+            'event_loop_lag': watchdog.stats(),
+            'rss_bytes': rss_after,
+            'rss_growth_bytes': rss_after - rss_before,
+            'extractor': song.ytdl.stats(),
+            'cache': cog.stats()['cache'],
+            'shared_audio': cog.stats()['shared_audio'],
+            'audio_underruns': sum(registry.counters.get('audio_underruns_total', {}).values()),
+            'stream_reopens': {dict(labels)['reason']: count
+                               for labels, count in registry.counters.get('stream_reopens_total', {}).items()},
+        }
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        report = asyncio.run(LoadTest(args).run())
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as wp:
+            wp.write(text)
+
+
+if __name__ == '__main__':
+    main()
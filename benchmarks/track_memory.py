@@ -0,0 +1,71 @@
+# This benchmark measures the memory used by every queued song
+# Usage: python benchmarks/track_memory.py [songs]
+# It compares the dicts which used to be queued with the Track records,
+# the member object is shared by every entry so only the reference to it is counted
+
+# This import is used to read the command line arguments
+import sys
+
+# This import is used to find the modules of the bot
+import os
+
+# This import is used to measure the allocated memory
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from track import Track
+
+
+class Member:
+    # Stands in for discord.Member, which is shared by the entries of a single requester
+    id = 123456789012345678
+
+    def __str__(self):
+        return 'requester#0001'
+
+
+def song(i):
+    # 500 different songs are queued over and over, like the playall files of many guilds
+    number = i % 500
+    return {'id': f'video{number:06d}', 'title': f'Artist {number} - Song title number {number}',
+            'webpage_url': f'https://www.youtube.com/watch?v=video{number:06d}',
+            'url': f'https://rr1---sn-example.googlevideo.com/videoplayback?expire=1700000000&id={number}' + 'x' * 900,
+            'duration': 200 + number, 'acodec': 'opus'}
+
+
+def old_entry(data, member):
+    return {'webpage_url': data['webpage_url'], 'requester': member, 'title': data['title'],
+            'url': data['url'], 'expires': 1700000000.0, 'acodec': data['acodec'], 'id': data['id'],
+            'duration': data['duration']}
+
+
+def measure(name, build, count):
+    member = Member()
+    songs = [song(i) for i in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entries = [build(data, member) for data in songs]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f'{name:>6}: {used / count:.0f} bytes per queued song ({count} songs)')
+    return entries
+
+
+def fresh(data):
+    # youtube_dl returns new string objects for every extraction, even for the same song
+    return {key: (value + ' ')[:-1] if isinstance(value, str) else value for key, value in data.items()}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # The stream link of a Track lives once per video in the shared cache, so it is not counted for it
+    measure('dict', lambda data, member: old_entry(fresh(data), member), count)
+    measure('Track', lambda data, member: Track.create(fresh(data), member), count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# This class is to cache the songs resolved by youtube_dl
+# A single cache is shared by every guild so a popular song is only searched once
+
+# This import is used to measure the size of the cached entries
+import sys
+
+# This import is used to expire the cached entries
+import time
+
+# This is used to keep the entries in the least recently used order
+from collections import OrderedDict
+
+# This is used to read the expiry time of the youtube stream links
+from urllib.parse import urlparse, parse_qs
+
+# This import brings in the cache settings
+import config
+
+# Stream links are dropped a little before youtube expires them so ffmpeg never opens a dead link
+STREAM_EXPIRY_MARGIN = 5 * 60
+
+# Rough memory used by the key, the OrderedDict node and the entry object
+ENTRY_OVERHEAD = 200
+
+
+def normalize_query(search: str):
+    # Searches which only differ in spacing or letter case must share the same cache entry
+    # Links are kept as they are because the video ids are case sensitive
+    search = ' '.join(search.split())
+    if search.startswith(('http://', 'https://')):
+        return search
+    return search.lower()
+
+
+def stream_expiry(url: str, now: float):
+    # Youtube writes the expiry time of the stream link in the expire parameter
+    expires = now + config.CACHE_STREAM_TTL
+    try:
+        expire = parse_qs(urlparse(url).query).get('expire')
+        if expire:
+            expires = min(expires, int(expire[0]) - STREAM_EXPIRY_MARGIN)
+    except ValueError:
+        pass
+
+    return expires
+
+
+class CachedTrack:
+    # The metadata of a single video with its short lived stream link
+
+    __slots__ = ('video_id', 'title', 'webpage_url', 'duration', 'url', 'acodec', 'meta_expires', 'stream_expires',
+                 'size')
+
+    def __init__(self, data, now):
+        self.video_id = data.get('id') or data['webpage_url']
+        self.title = data.get('title')
+        self.webpage_url = data.get('webpage_url')
+        self.duration = data.get('duration')
+        self.url = data.get('url')
+        self.acodec = data.get('acodec')
+
+        self.meta_expires = now + config.CACHE_METADATA_TTL
+        self.stream_expires = stream_expiry(self.url, now) if self.url else 0
+
+        self.size = ENTRY_OVERHEAD + sum(sys.getsizeof(value) for value in
+                                         (self.video_id, self.title, self.webpage_url, self.url))
+
+
+class TrackCache:
+    # Instance of this class caches the searches and the videos for every guild
+    # The searches and the videos share a single least recently used order and memory cap
+
+    __slots__ = ('max_bytes', 'bytes', 'hits', 'misses', '_entries')
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        # ('q', search) keys point to a video id, ('v', video id) keys hold the CachedTrack
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        try:
+            value, size = self._entries[key]
+        except KeyError:
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value, size):
+        self._pop(key)
+        self._entries[key] = (value, size)
+        self.bytes += size
+
+        # Dropping the least recently used entries till the cache is within the memory cap
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            old_key = next(iter(self._entries))
+            self._pop(old_key)
+
+    def _pop(self, key):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            return None
+
+        self.bytes -= size
+        return value
+
+    def get(self, video_id):
+        # Returns the cached video if its metadata is still valid
+        track = self._get(('v', video_id))
+        if track is not None and track.meta_expires <= time.time():
+            self._pop(('v', video_id))
+            return None
+
+        return track
+
+    def lookup(self, search: str):
+        # Returns the video for a search if it was resolved before
+        query = ('q', normalize_query(search))
+        video_id = self._get(query)
+        track = None if video_id is None else self.get(video_id)
+
+        if track is None:
+            if video_id is not None:
+                self._pop(query)
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return track
+
+    def store(self, search, data):
+        # Saves the data returned by youtube_dl for the search and for the video link itself
+        track = CachedTrack(data, time.time())
+        self._put(('v', track.video_id), track, track.size)
+
+        for query in {normalize_query(search), track.webpage_url}:
+            if query:
+                self._put(('q', query), track.video_id, ENTRY_OVERHEAD + sys.getsizeof(query))
+
+        return track
+
+    def stream_url(self, video_id):
+        # Returns the stream link of the video if it has not expired yet
+        track = self.get(video_id)
+        if track is None or not track.url or track.stream_expires <= time.time():
+            return None
+
+        return track.url
+
+    def invalidate_stream(self, video_id):
+        # Forgets the stream link of the video, used when ffmpeg could not open it
+        track = self._get(('v', video_id))
+        if track is not None:
+            track.stream_expires = 0
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+
+# The cache which is shared by every guild
+trackCache = TrackCache()
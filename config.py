@@ -0,0 +1,134 @@
+# This file holds the tunable settings of the bot
+# Every setting can be overridden by adding it to the env file
+
+# This import is used to read the settings from the environment
+import os
+
+# To load the environment file into the program
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int(name, default):
+    # Reads a whole number setting from the environment
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _float(name, default):
+    # Reads a decimal setting from the environment
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# Search result cache shared by every guild
+CACHE_MAX_BYTES = _int('CACHE_MAX_BYTES', 16 * 1024 * 1024)
+CACHE_METADATA_TTL = _float('CACHE_METADATA_TTL', 24 * 60 * 60)
+CACHE_STREAM_TTL = _float('CACHE_STREAM_TTL', 60 * 60)
+
+# Number of queued songs whose stream links are resolved while the current song plays
+PREFETCH_DEPTH = _int('PREFETCH_DEPTH', 3)
+
+# If enabled the ffmpeg process of the next song is started before the current song ends
+PREFETCH_OPEN_SOURCE = bool(_int('PREFETCH_OPEN_SOURCE', 1))
+
+# Number of songs of a playall file which are searched at the same time
+PLAYALL_CONCURRENCY = _int('PLAYALL_CONCURRENCY', 4)
+
+# Minimum number of seconds between two edits of the playall progress message
+PLAYALL_PROGRESS_INTERVAL = _float('PLAYALL_PROGRESS_INTERVAL', 3)
+
+# Largest playall file in bytes which the bot accepts
+PLAYALL_MAX_BYTES = _int('PLAYALL_MAX_BYTES', 256 * 1024)
+
+# If enabled the playall file is saved so that playall without a file plays it again
+PLAYALL_SAVE_COPY = bool(_int('PLAYALL_SAVE_COPY', 0))
+
+# Number of youtube_dl extractions which can run at the same time across every guild
+EXTRACTOR_WORKERS = _int('EXTRACTOR_WORKERS', 4)
+
+# SQLite file which remembers the resolved songs across restarts, leave it empty to disable it
+INDEX_PATH = os.getenv('INDEX_PATH', 'cache/tracks.sqlite3')
+INDEX_MAX_TRACKS = _int('INDEX_MAX_TRACKS', 100000)
+INDEX_FLUSH_INTERVAL = _float('INDEX_FLUSH_INTERVAL', 5)
+
+# pcm decodes the audio and changes the volume in python, opus leaves the volume and the encoding to ffmpeg
+AUDIO_MODE = os.getenv('AUDIO_MODE', 'pcm').lower()
+OPUS_BITRATE = _int('OPUS_BITRATE', 128)
+
+# Songs played often are downloaded to this directory and played from the disk, 0 bytes disables it
+# Every shard uses a shard<id> directory inside it and an even share of AUDIO_CACHE_MAX_BYTES
+# At most AUDIO_CACHE_DOWNLOADS songs are downloaded at the same time, on threads of their own
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', 'downloads')
+AUDIO_CACHE_MAX_BYTES = _int('AUDIO_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024)
+AUDIO_CACHE_MIN_PLAYS = _int('AUDIO_CACHE_MIN_PLAYS', 2)
+AUDIO_CACHE_MAX_DURATION = _int('AUDIO_CACHE_MAX_DURATION', 15 * 60)
+AUDIO_CACHE_DOWNLOADS = _int('AUDIO_CACHE_DOWNLOADS', 1)
+
+# Seconds of audio which are read ahead of the playback on a background thread, 0 reads every frame when it is played
+READAHEAD_SECONDS = _float('READAHEAD_SECONDS', 1)
+
+# If enabled the loudness of every song is measured by ffmpeg in the background and evened out at the playback
+# LOUDNESS_TARGET is in LUFS, the gain is limited to LOUDNESS_MAX_GAIN dB and the first LOUDNESS_SAMPLE_SECONDS are measured
+LOUDNESS_NORMALIZE = bool(_int('LOUDNESS_NORMALIZE', 0))
+LOUDNESS_TARGET = _float('LOUDNESS_TARGET', -16)
+LOUDNESS_MAX_GAIN = _float('LOUDNESS_MAX_GAIN', 10)
+LOUDNESS_SAMPLE_SECONDS = _int('LOUDNESS_SAMPLE_SECONDS', 120)
+LOUDNESS_WORKERS = _int('LOUDNESS_WORKERS', 1)
+
+# If enabled the guilds which start the same song within SHARED_AUDIO_BUFFER seconds share one ffmpeg process
+# The frames of the last SHARED_AUDIO_BUFFER seconds are kept, a guild which falls further behind gets its own process
+SHARED_AUDIO = bool(_int('SHARED_AUDIO', 0))
+SHARED_AUDIO_BUFFER = _float('SHARED_AUDIO_BUFFER', 15)
+
+# A song whose stream ends more than STREAM_RESUME_MARGIN seconds before its duration is resumed at the last second played
+# A song is resumed at most STREAM_RESUME_ATTEMPTS times
+STREAM_RESUME_MARGIN = _float('STREAM_RESUME_MARGIN', 5)
+STREAM_RESUME_ATTEMPTS = _int('STREAM_RESUME_ATTEMPTS', 3)
+
+# File the queues of the guilds are saved to so they are restored after a restart, leave it empty to disable it
+# The queues are saved every SNAPSHOT_INTERVAL seconds and when the bot closes, older than SNAPSHOT_MAX_AGE are dropped
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'cache/players.json.gz')
+SNAPSHOT_INTERVAL = _float('SNAPSHOT_INTERVAL', 60)
+SNAPSHOT_MAX_AGE = _float('SNAPSHOT_MAX_AGE', 24 * 60 * 60)
+
+# Seconds after which a player leaves the voice channel and is kept as a saved record until its guild uses a command
+# An idle player waits HIBERNATE_IDLE, a paused one HIBERNATE_PAUSED and one alone in its voice channel HIBERNATE_EMPTY
+# The players are checked every HIBERNATE_INTERVAL seconds, 0 disables the paused and empty checks
+HIBERNATE_IDLE = _float('HIBERNATE_IDLE', 300)
+HIBERNATE_PAUSED = _float('HIBERNATE_PAUSED', 15 * 60)
+HIBERNATE_EMPTY = _float('HIBERNATE_EMPTY', 120)
+HIBERNATE_INTERVAL = _float('HIBERNATE_INTERVAL', 30)
+
+# Largest number of songs which are queued from a playlist link
+PLAYLIST_IMPORT_LIMIT = _int('PLAYLIST_IMPORT_LIMIT', 200)
+
+# Number of shard processes started by main.py, auto uses one process per CPU core and 1 runs a single process
+BOT_SHARDS = os.getenv('BOT_SHARDS', '1')
+
+# Seconds between the start of two shards, discord only lets one shard identify at a time
+SHARD_START_DELAY = _float('SHARD_START_DELAY', 5)
+
+# Seconds between two statistics reports of every shard
+STATS_INTERVAL = _float('STATS_INTERVAL', 30)
+
+# If enabled the lag of the event loop is measured and the code which blocks it is logged
+LOOP_WATCHDOG = bool(_int('LOOP_WATCHDOG', 0))
+LOOP_WATCHDOG_INTERVAL = _float('LOOP_WATCHDOG_INTERVAL', 0.25)
+LOOP_WATCHDOG_THRESHOLD = _float('LOOP_WATCHDOG_THRESHOLD', 0.2)
+
+# Local port of the prometheus metrics endpoint and file the metrics are written to, 0 and empty disable them
+# Every shard adds its shard id to the port and to the file name
+METRICS_PORT = _int('METRICS_PORT', 0)
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+
+# Seconds the informational messages of a channel are gathered for, the added songs are sent as one summary
+OUTBOX_DELAY = _float('OUTBOX_DELAY', 1.5)
+
+# Largest number of songs which are listed in a summary of added songs
+OUTBOX_SUMMARY_SONGS = _int('OUTBOX_SUMMARY_SONGS', 10)
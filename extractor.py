@@ -0,0 +1,185 @@
+# This class runs the youtube_dl extractions of every guild on a dedicated pool of threads
+
+# This is used to implement the asynchronous operations like awaiting the extractions
+import asyncio
+
+# This is used to give every worker thread its own YoutubeDL instance
+import threading
+
+# This is used to measure how long the extractions wait in the queue
+import time
+
+# This is used to keep the pending extractions of each guild
+from collections import deque, OrderedDict
+
+# This is used to run the extractions outside of the default executor
+from concurrent.futures import ThreadPoolExecutor
+
+# This is used to create a coroutine in the async event loop
+from functools import partial
+
+# This import brings in the extractor settings
+import config
+
+# This is used to record the queue wait and the duration of the extractions
+from metrics import registry
+
+# Priorities of the extractions, songs requested with play are served before the bulk imports
+INTERACTIVE = 0
+BULK = 1
+
+
+class ExtractorPool:
+    # A single instance of this class is shared by every guild
+    # The pending extractions are served in priority order and round robin across the guilds,
+    # so one guild importing a huge playlist can not starve another guild's play command
+    # Identical extractions requested at the same time share a single youtube_dl call
+
+    __slots__ = ('options', 'flat_options', 'workers', 'running', 'started', 'completed', 'coalesced', 'wait_total', 'wait_max',
+                 '_factory', '_executor', '_local', '_queues', '_inflight')
+
+    def __init__(self, options, flat_options=None, workers=None, factory=None):
+        self.options = options
+        self.flat_options = flat_options  # Used for the playlists, which are read without their songs
+        self.workers = config.EXTRACTOR_WORKERS if workers is None else workers
+
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.coalesced = 0  # Extractions saved by joining an identical extraction
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+        self._factory = factory  # Creates the YoutubeDL instances, youtube_dl.YoutubeDL unless it is replaced
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='extractor')
+        self._local = threading.local()
+
+        # One OrderedDict per priority mapping a guild id to its pending extractions
+        self._queues = (OrderedDict(), OrderedDict())
+
+        # The shared future and priority of every queued or running extraction
+        self._inflight = {}
+
+    def _ytdl(self, flat=False):
+        # YoutubeDL is not thread safe, so every thread gets its own instances
+        name = 'flat_ytdl' if flat else 'ytdl'
+        ytdl = getattr(self._local, name, None)
+        if ytdl is None:
+            if self._factory is None:
+                # youtube_dl takes a while to import, so it is imported by the warm up after login
+                # This youtube_dl is used to search the songs and download it from the youtube platform
+                import youtube_dl
+                self._factory = youtube_dl.YoutubeDL
+
+            ytdl = self._factory(self.flat_options if flat else self.options)
+            setattr(self._local, name, ytdl)
+        return ytdl
+
+    async def warm_up(self):
+        # Imports youtube_dl and creates the instance of a worker thread before the first song is requested
+        await asyncio.get_event_loop().run_in_executor(self._executor, self._ytdl)
+
+    def _extract(self, url, download, flat):
+        return self._ytdl(flat).extract_info(url, download=download)
+
+    def prepare_filename(self, data):
+        return self._ytdl().prepare_filename(data)
+
+    def download(self, url):
+        # Downloads a song on the calling thread and returns its info and file, used by the audio cache
+        # The downloads run on their own threads so they never hold the workers the play commands wait for
+        ytdl = self._ytdl()
+        data = ytdl.extract_info(url, download=True)
+        if 'entries' in data:
+            data = data['entries'][0]
+        return data, ytdl.prepare_filename(data)
+
+    async def extract_info(self, url, *, download=False, flat=False, guild=None, priority=INTERACTIVE):
+        # Queues an extraction and waits for its result
+        # flat only reads the titles and links of a playlist without extracting its songs
+        # If the same extraction is already pending the caller waits for that one instead
+        key = (url, download, flat)
+        try:
+            future, queued_priority = self._inflight[key]
+
+        except KeyError:
+            future = asyncio.get_event_loop().create_future()
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._inflight[key] = (future, priority)
+            self._enqueue(url, download, flat, future, guild, priority)
+
+        else:
+            self.coalesced += 1
+            if priority < queued_priority:
+                # A play command joined a bulk extraction, so it is queued once more with the higher priority
+                # Whichever copy runs first completes the shared future and the other one is dropped
+                self._inflight[key] = (future, priority)
+                self._enqueue(url, download, flat, future, guild, priority)
+
+        # The shield keeps one cancelled caller from cancelling the extraction for the other callers
+        return await asyncio.shield(future)
+
+    def _enqueue(self, url, download, flat, future, guild, priority):
+        queue = self._queues[priority]
+        queue.setdefault(guild, deque()).append((url, download, flat, future, time.monotonic()))
+        self._dispatch()
+
+    def _next_job(self):
+        for queue in self._queues:
+            while queue:
+                # The guild at the front is served once and moved to the back of the round robin
+                guild, jobs = queue.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    queue[guild] = jobs
+
+                # Extractions which were already completed by a higher priority copy are dropped
+                if not job[3].done():
+                    return job
+
+        return None
+
+    def _dispatch(self):
+        loop = asyncio.get_event_loop()
+        while self.running < self.workers:
+            job = self._next_job()
+            if job is None:
+                return
+
+            url, download, flat, future, queued = job
+            started = time.monotonic()
+            waited = started - queued
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            registry.observe('extractor_wait_seconds', waited)
+
+            self.running += 1
+            self.started += 1
+            task = loop.run_in_executor(self._executor, self._extract, url, download, flat)
+            kind = 'download' if download else 'flat' if flat else 'info'
+            task.add_done_callback(partial(self._finished, future, kind, started))
+
+    def _finished(self, future, kind, started, task):
+        self.running -= 1
+        self.completed += 1
+        registry.observe('extract_seconds', time.monotonic() - started, kind=kind)
+        if task.exception() is not None:
+            registry.inc('extract_errors_total', kind=kind)
+
+        if not future.done():
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        self._dispatch()
+
+    def queued(self):
+        return [sum(len(jobs) for jobs in queue.values()) for queue in self._queues]
+
+    def stats(self):
+        interactive, bulk = self.queued()
+        return {'workers': self.workers, 'running': self.running, 'completed': self.completed,
+                'coalesced': self.coalesced, 'queued_interactive': interactive, 'queued_bulk': bulk,
+                'wait_avg': self.wait_total / self.started if self.started else 0.0,
+                'wait_max': self.wait_max}
@@ -0,0 +1,68 @@
+# This class finds the players which do not need a live task and voice connection any more
+# A player which has been paused for long or is alone in its voice channel is hibernated by the cog,
+# its queue is kept as a snapshot record and it is revived once its guild uses a command again
+
+# This is used to implement the asynchronous operations like the periodic checks
+import asyncio
+
+# This is used to measure how long a player has been paused or alone
+import time
+
+# This import brings in the hibernation settings
+import config
+
+
+def listeners(channel):
+    # The members of a voice channel who are not bots
+    return [member for member in channel.members if not member.bot]
+
+
+class Hibernation:
+
+    __slots__ = ('paused', 'empty', 'interval', '_since')
+
+    def __init__(self, paused=None, empty=None, interval=None):
+        self.paused = config.HIBERNATE_PAUSED if paused is None else paused
+        self.empty = config.HIBERNATE_EMPTY if empty is None else empty
+        self.interval = config.HIBERNATE_INTERVAL if interval is None else interval
+
+        # guild id -> (state, when the player was first seen in it), the state is 'paused' or 'empty'
+        self._since = {}
+
+    def reason(self, guild, now):
+        # Returns why the player of the guild should be hibernated, or None if it is still in use
+        voice = guild.voice_client
+        state = None
+        if voice is not None and voice.is_connected():
+            if not listeners(voice.channel):
+                state = 'empty'
+            elif voice.is_paused():
+                state = 'paused'
+
+        if state is None:
+            self._since.pop(guild.id, None)
+            return None
+
+        seen, since = self._since.setdefault(guild.id, (state, now))
+        if seen != state:
+            self._since[guild.id] = (state, now)
+            return None
+
+        return state if now - since >= (self.empty if state == 'empty' else self.paused) else None
+
+    def forget(self, guild_id):
+        self._since.pop(guild_id, None)
+
+    async def run(self, cog):
+        # The players are checked on the event loop, hibernating one only disconnects it and saves its record
+        while self.interval:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            for player in list(cog.players.values()):
+                reason = self.reason(player._guild, now)
+                if reason is not None:
+                    await cog.hibernate(player._guild, reason)
+
+    def stats(self):
+        states = [state for state, _ in self._since.values()]
+        return {'paused': states.count('paused'), 'empty': states.count('empty')}
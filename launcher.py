@@ -0,0 +1,170 @@
+# This class runs the bot in several shard processes and restarts the shards which crash
+# Every shard has its own event loop, music players and extractor pool
+
+# This import is used to write the combined statistics of the shards
+import json
+
+# This is used to start the shard processes
+import multiprocessing
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to stop the shards when the supervisor is stopped
+import signal
+
+# This is used to wait between the restarts of a crashed shard
+import time
+
+# This is used to tell an empty statistics queue apart
+from queue import Empty
+
+# This import brings in the sharding settings
+import config
+
+# A shard which ran this long before crashing is restarted without waiting
+STABLE_UPTIME = 10 * 60
+
+# Longest wait before a crashed shard is restarted
+MAX_RESTART_DELAY = 5 * 60
+
+# Statistics which are not added up across the shards, like the seconds each shard took to start
+PER_SHARD = ('startup',)
+
+
+def combine(total, stats):
+    # Adds the counters of the statistics of one shard to the totals and keeps the largest maximum
+    # The averages, percentiles and startup times only make sense per shard, they are left in the shard statistics
+    for key, value in stats.items():
+        if key in PER_SHARD:
+            continue
+        if isinstance(value, dict):
+            combine(total.setdefault(key, {}), value)
+        elif not isinstance(value, (int, float)) or isinstance(value, bool) or _per_shard(key):
+            continue
+        elif key == 'max' or key.endswith('_max'):
+            total[key] = max(total.get(key, value), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _per_shard(key):
+    # Averages like avg and wait_avg and percentiles like p50 and p99
+    return key == 'avg' or key.endswith('_avg') or (key[:1] == 'p' and key[1:].isdigit())
+
+
+class ShardSupervisor:
+    # target is called as target(shard_id, shard_count, stats_queue) in every shard process
+
+    __slots__ = ('target', 'shard_count', 'stats_path', 'stats', '_context', '_queue', '_processes', '_started',
+                 '_crashes', '_stopping')
+
+    def __init__(self, target, shard_count, stats_path='stats/shards.json'):
+        self.target = target
+        self.shard_count = shard_count
+        self.stats_path = stats_path
+        self.stats = {}  # shard id -> latest statistics of the shard
+
+        # The shards are spawned so they do not inherit the state of this process
+        self._context = multiprocessing.get_context('spawn')
+        self._queue = self._context.Queue()
+        self._processes = {}
+        self._started = {}
+        self._crashes = {}
+        self._stopping = False
+
+    def start(self, shard_id):
+        process = self._context.Process(target=self.target, name=f'shard-{shard_id}',
+                                        args=(shard_id, self.shard_count, self._queue))
+        process.start()
+        self._processes[shard_id] = process
+        self._started[shard_id] = time.monotonic()
+
+    def stop(self, *_):
+        self._stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for shard_id in range(self.shard_count):
+            if self._stopping:
+                break
+            self.start(shard_id)
+            time.sleep(config.SHARD_START_DELAY)
+
+        restarts = {}  # shard id -> time the crashed shard is started again
+        last_report = time.monotonic()
+
+        while not self._stopping and (self._processes or restarts):
+            self._collect_stats()
+
+            now = time.monotonic()
+            for shard_id, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+
+                del self._processes[shard_id]
+                if process.exitcode == 0:
+                    # The shard was stopped on purpose
+                    continue
+
+                restarts[shard_id] = now + self._restart_delay(shard_id, now)
+                print(f'Shard {shard_id} exited with code {process.exitcode}, '
+                      f'restarting in {restarts[shard_id] - now:.0f}s')
+
+            for shard_id, when in list(restarts.items()):
+                if when <= now:
+                    del restarts[shard_id]
+                    self.start(shard_id)
+
+            if now - last_report >= config.STATS_INTERVAL:
+                last_report = now
+                self.write_stats()
+
+        for process in self._processes.values():
+            process.join()
+
+    def _restart_delay(self, shard_id, now):
+        # The delay doubles with every crash, unless the shard ran long enough before it crashed
+        if now - self._started[shard_id] >= STABLE_UPTIME:
+            self._crashes[shard_id] = 0
+
+        crashes = self._crashes.get(shard_id, 0)
+        self._crashes[shard_id] = crashes + 1
+        return min(config.SHARD_START_DELAY * 2 ** crashes, MAX_RESTART_DELAY)
+
+    def _collect_stats(self):
+        try:
+            shard_id, stats = self._queue.get(timeout=1)
+        except Empty:
+            return
+
+        self.stats[shard_id] = stats
+        while True:
+            try:
+                shard_id, stats = self._queue.get_nowait()
+            except Empty:
+                return
+            self.stats[shard_id] = stats
+
+    def combined_stats(self):
+        total = {}
+        for stats in self.stats.values():
+            combine(total, stats)
+
+        total['shards'] = self.shard_count
+        total['shards_alive'] = sum(process.is_alive() for process in self._processes.values())
+        return total
+
+    def write_stats(self):
+        # Writes the statistics of every shard and their totals as json
+        directory = os.path.dirname(self.stats_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.stats_path, 'w') as wp:
+            json.dump({'total': self.combined_stats(), 'shards': self.stats}, wp, indent=2)
@@ -0,0 +1,124 @@
+# This class measures how loud every song is so the songs can be played at an even loudness
+# ffmpeg measures the integrated loudness in its own process, the worker threads only wait for it
+# The gain of a song is kept by its video id in memory and in the song index, so a song is measured once
+
+# This is used to implement the asynchronous operations like awaiting the measurements
+import asyncio
+
+# This is used to read the measurement printed by ffmpeg
+import json
+
+# This is used to check the measured loudness
+import math
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to split the ffmpeg options
+import shlex
+
+# This is used to start ffmpeg
+import subprocess
+
+# This is used to keep the gains which were used most recently
+from collections import OrderedDict
+
+# This is used to wait for the ffmpeg processes outside of the event loop
+from concurrent.futures import ThreadPoolExecutor
+
+# This is used to remember the gains across restarts
+from track_index import trackIndex
+
+# This import brings in the loudness settings
+import config
+
+# This is used to count the measurements
+from metrics import registry
+
+# Largest number of gains kept in memory
+MAX_GAINS = 50000
+
+
+def _lower_priority():
+    # Runs in the ffmpeg process before it starts, the playback keeps the CPU before the measurements
+    os.nice(10)
+
+
+def measure(url, before_options, seconds):
+    # Returns the integrated loudness of the first seconds of the song in LUFS
+    args = ['ffmpeg', '-hide_banner', *shlex.split(before_options), '-i', url, '-t', str(seconds), '-vn',
+            '-af', 'loudnorm=print_format=json', '-f', 'null', '-']
+    result = subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            timeout=seconds * 2 + 60, preexec_fn=_lower_priority if os.name == 'posix' else None)
+
+    # The measurement is the last json object printed by the loudnorm filter
+    output = result.stderr.decode(errors='replace')
+    return float(json.loads(output[output.rindex('{'):output.rindex('}') + 1])['input_i'])
+
+
+class Loudness:
+    # A single instance of this class is shared by every guild
+
+    __slots__ = ('target', 'max_gain', 'seconds', 'measured', 'failed', '_gains', '_pending', '_executor')
+
+    def __init__(self, target=None, max_gain=None, seconds=None, workers=None):
+        self.target = config.LOUDNESS_TARGET if target is None else target
+        self.max_gain = config.LOUDNESS_MAX_GAIN if max_gain is None else max_gain
+        self.seconds = config.LOUDNESS_SAMPLE_SECONDS if seconds is None else seconds
+
+        self.measured = 0
+        self.failed = 0
+
+        self._gains = OrderedDict()  # video id -> gain in dB
+        self._pending = {}  # video id -> task which looks up or measures the gain
+        self._executor = ThreadPoolExecutor(max_workers=config.LOUDNESS_WORKERS if workers is None else workers,
+                                            thread_name_prefix='loudness')
+
+    def gain(self, video_id):
+        # Returns the gain in dB which evens out the song, or None if it is not known yet
+        gain = self._gains.get(video_id)
+        if gain is not None:
+            self._gains.move_to_end(video_id)
+        return gain
+
+    def prepare(self, video_id, url, opts):
+        # Starts the lookup or the measurement of a song, called when a song is queued and when its link is resolved
+        if not config.LOUDNESS_NORMALIZE or not url or video_id in self._gains or video_id in self._pending:
+            return
+
+        task = asyncio.get_event_loop().create_task(self._prepare(video_id, url, opts['before_options']))
+        self._pending[video_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(video_id, None))
+
+    async def _prepare(self, video_id, url, before_options):
+        gain = await trackIndex.gain(video_id)
+        if gain is None:
+            loop = asyncio.get_event_loop()
+            try:
+                with registry.timer('loudness_measure_seconds'):
+                    loudness = await loop.run_in_executor(self._executor, measure, url, before_options, self.seconds)
+            except (OSError, ValueError, KeyError, subprocess.SubprocessError):
+                # A song which can not be measured is played without a gain
+                self.failed += 1
+                registry.inc('loudness_measurements_total', result='failed')
+                return
+
+            self.measured += 1
+            registry.inc('loudness_measurements_total', result='measured')
+
+            # Silence has no loudness, it is left as it is
+            gain = 0.0 if not math.isfinite(loudness) else self.target - loudness
+            gain = round(max(-self.max_gain, min(self.max_gain, gain)), 2)
+            trackIndex.remember_gain(video_id, gain)
+
+        self._gains[video_id] = gain
+        if len(self._gains) > MAX_GAINS:
+            self._gains.popitem(last=False)
+
+    def stats(self):
+        return {'gains': len(self._gains), 'pending': len(self._pending), 'measured': self.measured,
+                'failed': self.failed}
+
+
+# The loudness of the songs shared by every guild
+loudness = Loudness()
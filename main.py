@@ -1,3 +1,7 @@
+# The profile of the cold start is imported first so it can time the other imports
+from startup import startupProfile
+startupProfile.trace_imports()
+
 # To load the environment file into the program
 import os
 from dotenv import load_dotenv
@@ -5,22 +9,73 @@ from dotenv import load_dotenv
 # To create a instance of the discord bot 
 from discord.ext import commands
 
+# This is used to report the statistics of a shard to the supervisor
+import asyncio
+
 # Importing the music bot class
 import BotCommands
 
+# Importing the song index so the buffered songs are written when the bot stops
+from track_index import trackIndex
+
+# Importing the settings of the bot
+import config
+
+startupProfile.mark('imports')
 
 load_dotenv()
 Discord_token = os.getenv('DISCORD_TOKEN')
 cmdPrefix = '$'
-bot = commands.Bot(command_prefix=cmdPrefix)
-bot.remove_command('help')
 
 
 def setup(bot):
     bot.add_cog(BotCommands.MusicBot(bot,cmdPrefix))
 
 
+class MusicBotClient(commands.Bot):
+
+    async def close(self):
+        # The queues are saved before discord.py disconnects the voice clients and stops the players
+        cog = self.get_cog('MusicBot')
+        if cog is not None:
+            cog.save_snapshot()
+        await super().close()
+
+
+def create_bot(shard_id=None, shard_count=None):
+    # Without a shard id the bot connects every guild in this process
+    bot = MusicBotClient(command_prefix=cmdPrefix, shard_id=shard_id, shard_count=shard_count)
+    bot.remove_command('help')
+    setup(bot)
+    return bot
+
+
+async def report_stats(bot, shard_id, stats_queue):
+    # Sends the statistics of this shard to the supervisor every STATS_INTERVAL seconds
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        stats = bot.get_cog('MusicBot').stats()
+        stats['guilds'] = len(bot.guilds)
+        stats_queue.put((shard_id, stats))
+        await asyncio.sleep(config.STATS_INTERVAL)
+
+
+def run(shard_id=None, shard_count=None, stats_queue=None):
+    # Runs the bot in this process, the supervisor calls it in every shard process
+    bot = create_bot(shard_id, shard_count)
+    if stats_queue is not None:
+        bot.loop.create_task(report_stats(bot, shard_id, stats_queue))
+
+    bot.run(Discord_token)
+    trackIndex.close()
+
 
-setup(bot)
+if __name__ == '__main__':
+    if config.BOT_SHARDS == '1':
+        run()
+    else:
+        # Importing the supervisor of the shard processes
+        from launcher import ShardSupervisor
 
-bot.run(Discord_token)
+        shards = (os.cpu_count() or 1) if config.BOT_SHARDS == 'auto' else int(config.BOT_SHARDS)
+        ShardSupervisor(run, shards).run()
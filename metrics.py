@@ -0,0 +1,157 @@
+# This class records the distribution of measured durations
+# It is used to report the percentiles of the event loop lag and of the command stages
+# The registry at the end of the file exports them in the prometheus text format
+
+# This is used to find the bucket of a measurement
+from bisect import bisect_left
+
+# This is used to guard the registry, the audio threads add series while the event loop exports them
+import threading
+
+# This is used to measure the durations
+import time
+
+# Upper bounds of the buckets in seconds, from one millisecond to one minute
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket counts everything above the bounds
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Estimates a percentile by interpolating inside the bucket which holds it
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+
+        return self.max
+
+    def stats(self):
+        return {'count': self.count, 'avg': self.sum / self.count if self.count else 0.0,
+                'p50': self.quantile(.5), 'p99': self.quantile(.99), 'max': self.max}
+
+
+class Metrics:
+    # The registry of the histograms and counters of the bot
+    # Every metric can have labels, like the command name, and is exported in the prometheus text format
+
+    __slots__ = ('prefix', 'histograms', 'counters', '_lock')
+
+    def __init__(self, prefix='furybot_'):
+        self.prefix = prefix
+        self.histograms = {}  # name -> {labels -> Histogram}
+        self.counters = {}  # name -> {labels -> value}
+        self._lock = threading.Lock()  # Held while a series is added and while the series are copied for an export
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def histogram(self, name, **labels):
+        # Returns the histogram of the labels, code which observes every audio frame keeps it to skip the lookup
+        key = tuple(sorted(labels.items()))
+        histogram = self.histograms.get(name, {}).get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, {}).get(key)
+                if histogram is None:
+                    histogram = self.histograms[name][key] = Histogram()
+        return histogram
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def _snapshot(self):
+        # Copies the series so they can be read while the audio threads add new ones
+        with self._lock:
+            counters = {name: list(series.items()) for name, series in self.counters.items()}
+            histograms = {name: list(series.items()) for name, series in self.histograms.items()}
+        return counters, histograms
+
+    def timer(self, name, **labels):
+        # Measures the duration of a with block
+        return Timer(self, name, labels)
+
+    def render(self):
+        # Returns every metric in the prometheus text format
+        counters, histograms = self._snapshot()
+        lines = []
+        for name, series in sorted(counters.items()):
+            lines.append(f'# TYPE {self.prefix}{name} counter')
+            for labels, value in series:
+                lines.append(f'{self.prefix}{name}{_labels(labels)} {value}')
+
+        for name, series in sorted(histograms.items()):
+            lines.append(f'# TYPE {self.prefix}{name} histogram')
+            for labels, histogram in series:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{self.prefix}{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{self.prefix}{name}_sum{_labels(labels)} {histogram.sum}')
+                lines.append(f'{self.prefix}{name}_count{_labels(labels)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def stats(self):
+        # The percentiles of every histogram, used by the statistics of the shards
+        _, histograms = self._snapshot()
+        return {name + ''.join(f'.{value}' for _, value in labels): histogram.stats()
+                for name, series in histograms.items() for labels, histogram in series}
+
+
+class Timer:
+
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.monotonic() - self.start, **self.labels)
+        return False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+# The metrics which are shared by every guild
+registry = Metrics()
@@ -0,0 +1,67 @@
+# This class exports the metrics of the bot in the prometheus text format
+# The metrics are served on a local http endpoint, written to a file, or both
+
+# This is used to implement the asynchronous operations like the periodic file dump
+import asyncio
+
+# This import brings in the file handling capabilities
+import os
+
+# This import brings in the metrics of the bot
+from metrics import registry
+
+# This import brings in the metrics settings
+import config
+
+
+def _write(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # The file is replaced at once so a scraper never reads half of it
+    with open(path + '.tmp', 'w') as wp:
+        wp.write(text)
+    os.replace(path + '.tmp', path)
+
+
+class MetricsExporter:
+
+    __slots__ = ('port', 'path', 'interval', '_runner')
+
+    def __init__(self, shard_id=None, port=None, path=None, interval=None):
+        port = config.METRICS_PORT if port is None else port
+        path = config.METRICS_FILE if path is None else path
+
+        self.port = port + (shard_id or 0) if port else 0
+        if path and shard_id is not None:
+            root, ext = os.path.splitext(path)
+            path = f'{root}-shard{shard_id}{ext}'
+        self.path = path
+        self.interval = config.STATS_INTERVAL if interval is None else interval
+        self._runner = None
+
+    async def run(self):
+        if self.port:
+            # aiohttp.web is only imported if the endpoint is enabled
+            # This is used to serve the metrics endpoint
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get('/metrics', self.handle)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, '127.0.0.1', self.port).start()
+
+        loop = asyncio.get_event_loop()
+        while self.path:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(None, _write, self.path, registry.render())
+
+    async def handle(self, request):
+        from aiohttp import web
+        return web.Response(text=registry.render(), content_type='text/plain')
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,271 @@
+# This class sends the informational messages of a text channel, like the added songs and the now playing message
+# The replies of the commands are sent at once, the outbox only sends its messages when no command is replying
+# The added songs are gathered into a single summary and the kept messages are edited instead of sent again
+
+# This is used to implement the asynchronous operations like the background tasks
+import asyncio
+
+# This is used to keep the pending updates in the order they were made
+from collections import OrderedDict, deque
+
+# This is used to learn about the rate limits which discord.py retries by itself
+import logging
+
+# This is used to measure the cooldown of the rate limits
+import time
+
+# This brings in the discord library
+import discord
+
+# This import brings in the outbox settings
+import config
+
+# This is used to count the messages and the rate limits
+from metrics import registry
+
+# Longest time in seconds an informational message waits for the replies of the commands
+REPLY_WAIT = 5
+
+
+class RateLimits(logging.Handler):
+    # discord.py sleeps and retries a request which got a 429 response and only logs it
+    # The log records of discord.http are counted here, the outboxes wait for the cooldown of their channel
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.hits = 0
+        self.global_until = 0.0
+        self._channels = {}  # channel id -> end of the cooldown
+        self._pending = None  # (retry_after, channel id) of a bucket warning which may be followed by a global one
+
+    def emit(self, record):
+        message = record.msg
+        if not isinstance(message, str) or 'rate limit' not in message or not record.args:
+            return
+
+        try:
+            retry_after = float(record.args[0])
+        except (TypeError, ValueError):
+            retry_after = 0.0
+
+        if message.startswith('Global'):
+            # discord.py logs the bucket of every 429 first, the global warning replaces it
+            self._pending = None
+            self.hit(retry_after)
+            return
+
+        # The bucket of a route starts with its channel id, the routes without a channel start with None
+        bucket = str(record.args[1]) if len(record.args) > 1 else ''
+        channel_id = bucket.split(':', 1)[0]
+        self._settle()
+        self._pending = (retry_after, channel_id if channel_id not in ('', 'None') else None)
+
+        try:
+            # The global warning is logged right after the bucket one, before discord.py awaits anything
+            asyncio.get_running_loop().call_soon(self._settle)
+        except RuntimeError:
+            self._settle()
+
+    def _settle(self):
+        # Counts the bucket warning which was not followed by a global one
+        if self._pending is not None:
+            (retry_after, channel_id), self._pending = self._pending, None
+            self.hit(retry_after, channel_id, route=channel_id is None)
+
+    def hit(self, retry_after, channel_id=None, *, route=False):
+        # route is set for the routes without a channel, their cooldown does not hold back any outbox
+        now = time.monotonic()
+        self.hits += 1
+        registry.inc('discord_rate_limited_total', scope='route' if route else 'channel' if channel_id else 'global')
+
+        if route:
+            return
+        if channel_id is None:
+            self.global_until = max(self.global_until, now + retry_after)
+            return
+
+        for key, until in list(self._channels.items()):
+            if until < now:
+                del self._channels[key]
+        self._channels[str(channel_id)] = max(self._channels.get(str(channel_id), 0.0), now + retry_after)
+
+    async def wait(self, channel_id):
+        delay = max(self.global_until, self._channels.get(str(channel_id), 0.0)) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        now = time.monotonic()
+        return {'rate_limited': self.hits, 'cooling_channels': sum(1 for until in self._channels.values() if until > now),
+                'global_cooldown': max(0.0, self.global_until - now)}
+
+
+class Outbox:
+
+    __slots__ = ('channel', 'loop', 'replies', '_idle', '_messages', '_updates', '_posts', '_added', '_task')
+
+    def __init__(self, channel, loop):
+        self.channel = channel
+        self.loop = loop
+
+        # Number of commands which are replying in the channel
+        self.replies = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        self._messages = {}  # key -> message which is edited by the next update of the key
+        self._updates = OrderedDict()  # key -> (embed or None to delete the message, forget the key afterwards)
+        self._posts = deque()  # Messages which are sent once
+        self._added = []  # (author, title, url) of the songs added since the last summary
+        self._task = None
+
+    def reply_started(self):
+        self.replies += 1
+        self._idle.clear()
+
+    def reply_finished(self):
+        self.replies = max(self.replies - 1, 0)
+        if not self.replies:
+            self._idle.set()
+
+    def added(self, author, title, url):
+        # The songs added within OUTBOX_DELAY seconds are announced by a single message
+        self._added.append((str(author), title, url))
+        self._schedule()
+
+    def post(self, content=None, *, embed=None):
+        self._posts.append({'content': content, 'embed': embed})
+        self._schedule()
+
+    def update(self, key, embed, *, last=False):
+        # Only the newest embed of a key is sent, it edits the message sent for the key before
+        # If last is set the message is not edited anymore afterwards
+        self._updates[key] = (embed, last)
+        self._schedule()
+
+    def discard(self, key):
+        # Deletes the message sent for the key
+        self._updates[key] = (None, True)
+        self._schedule()
+
+    async def replace(self, key, embed):
+        # Sends the message of the key again at the bottom of the channel, used by the replies of the commands
+        self._updates.pop(key, None)
+        message = self._messages.pop(key, None)
+        if message is not None:
+            await self._delete(message)
+
+        message = await self._send(kind='reply', embed=embed)
+        if message is not None:
+            self._messages[key] = message
+
+    def _pending(self):
+        return self._added or self._posts or self._updates
+
+    def _schedule(self):
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._flush())
+
+    async def _flush(self):
+        # Gathers a burst of messages, then sends them one at a time while no command is replying
+        await asyncio.sleep(config.OUTBOX_DELAY)
+
+        while self._pending():
+            try:
+                await asyncio.wait_for(self._idle.wait(), REPLY_WAIT)
+            except asyncio.TimeoutError:
+                pass
+            await rateLimits.wait(self.channel.id)
+
+            if self._added:
+                embed = self._summary(self._added)
+                self._added = []
+                await self._send(kind='added', embed=embed)
+
+            elif self._posts:
+                await self._send(kind='post', **self._posts.popleft())
+
+            else:
+                key, (embed, last) = self._updates.popitem(last=False)
+                await self._apply(key, embed, last)
+
+        if not self._messages and not self.replies:
+            outboxes.pop(self.channel.id, None)
+
+    def _summary(self, added):
+        if len(added) == 1:
+            author, title, url = added[0]
+            return discord.Embed(description=f'**`{author}: Added`** **[{title}]({url}) to the Queue.]**',
+                                 colour=discord.Colour.blue())
+
+        registry.inc('discord_notices_coalesced_total', len(added) - 1)
+        authors = ', '.join(dict.fromkeys(author for author, _, _ in added))
+        lines = [f'**[{title}]({url})**' for _, title, url in added[:config.OUTBOX_SUMMARY_SONGS]]
+        if len(added) > config.OUTBOX_SUMMARY_SONGS:
+            lines.append(f'and {len(added) - config.OUTBOX_SUMMARY_SONGS} more')
+
+        return discord.Embed(description=f'**`{authors}: Added`** **{len(added)}** songs to the Queue.\n' +
+                                         '\n'.join(lines), colour=discord.Colour.blue())
+
+    async def _apply(self, key, embed, last):
+        message = self._messages.get(key)
+        if embed is None:
+            self._messages.pop(key, None)
+            if message is not None:
+                await self._delete(message)
+            return
+
+        if message is not None:
+            try:
+                with registry.timer('discord_send_seconds', kind='edit'):
+                    await message.edit(embed=embed)
+            except discord.NotFound:
+                # The message was deleted by someone, it is sent again
+                message = None
+            except discord.HTTPException as e:
+                self._failed(e)
+
+        if message is None:
+            message = await self._send(kind='update', embed=embed)
+
+        if last or message is None:
+            self._messages.pop(key, None)
+        else:
+            self._messages[key] = message
+
+    async def _send(self, kind, **kwargs):
+        try:
+            with registry.timer('discord_send_seconds', kind=kind):
+                return await self.channel.send(**kwargs)
+        except discord.HTTPException as e:
+            self._failed(e)
+            return None
+
+    async def _delete(self, message):
+        try:
+            await message.delete()
+        except discord.HTTPException as e:
+            if not isinstance(e, discord.NotFound):
+                self._failed(e)
+
+    def _failed(self, error):
+        registry.inc('discord_send_errors_total', status=error.status)
+        if error.status == 429:
+            # discord.py gave up retrying the request
+            rateLimits.hit(getattr(error, 'retry_after', 1.0), self.channel.id)
+
+
+def outbox_for(channel, loop):
+    # Every text channel has a single outbox, it is dropped when it has nothing left to send or edit
+    outbox = outboxes.get(channel.id)
+    if outbox is None:
+        outbox = outboxes[channel.id] = Outbox(channel, loop)
+    return outbox
+
+
+# The outboxes of the text channels, keyed by the channel id
+outboxes = {}
+
+# The rate limits seen by every outbox
+rateLimits = RateLimits()
+logging.getLogger('discord.http').addHandler(rateLimits)
@@ -0,0 +1,176 @@
+# This class adds the songs of a playlist file to the queue of a guild
+# The songs are searched concurrently but queued in the same order as the file
+
+# This is used to implement the asynchronous operations like the background tasks
+import asyncio
+
+# This is used to download the playlist file without blocking the event loop
+import aiohttp
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to rate limit the edits of the progress message
+import time
+
+# This brings in the functionality of the discord library
+import discord
+
+# This is used to edit the progress message without using up the rate limits of the channel
+from outbox import outbox_for
+
+# This is used to call upon the YTDLsource class
+from song import YTDLSource
+
+# This is used to queue the searches of the file behind the play commands
+from extractor import BULK
+
+# This import brings in the playall settings
+import config
+
+
+async def attachment_lines(attachment, *, loop, save_path=None, max_bytes=None):
+    # Streams the lines of an attached playlist file as they are downloaded
+    # If save_path is given the file is written to the disk in the executor once it is downloaded
+    max_bytes = config.PLAYALL_MAX_BYTES if max_bytes is None else max_bytes
+    received = 0
+    content = []
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+
+            async for line in response.content:
+                received += len(line)
+                if received > max_bytes:
+                    break
+
+                if save_path:
+                    content.append(line)
+                yield line.decode('utf-8', errors='replace')
+
+    if save_path:
+        await loop.run_in_executor(None, _write_file, save_path, b''.join(content))
+
+
+def _write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as wp:
+        wp.write(content)
+
+
+def _read_file(path, max_bytes):
+    with open(path, 'r', errors='replace') as sg:
+        return sg.read(max_bytes).splitlines()
+
+
+async def file_lines(path, *, loop, max_bytes=None):
+    # Reads a saved playlist file in the executor and yields its lines
+    max_bytes = config.PLAYALL_MAX_BYTES if max_bytes is None else max_bytes
+    for line in await loop.run_in_executor(None, _read_file, path, max_bytes):
+        yield line
+
+
+class PlaylistImport:
+    # Instance of this class is created for every playall command
+
+    __slots__ = ('ctx', 'cog', 'player', 'concurrency', 'added', 'failed', 'read', 'finished',
+                 'message', '_last_edit')
+
+    def __init__(self, ctx, player, concurrency=None):
+        self.ctx = ctx
+        self.cog = ctx.cog
+        self.player = player
+        self.concurrency = config.PLAYALL_CONCURRENCY if concurrency is None else concurrency
+
+        self.added = 0
+        self.failed = 0
+        self.read = 0
+        self.finished = False
+
+        self._last_edit = 0  # The progress message is edited instead of sending a message per song
+
+    def active(self):
+        # The import stops if the player was destroyed while the songs were being searched
+        return self.cog.players.get(self.ctx.guild.id) is self.player
+
+    async def run(self, lines):
+        # lines is an asynchronous iterable of the searches written in the file
+        loop = self.ctx.bot.loop
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # The pending searches, bounded so a huge file is not searched far ahead of the queue
+        pending = asyncio.Queue(maxsize=self.concurrency * 4)
+
+        async def resolve(search):
+            async with semaphore:
+                return await YTDLSource.create_source(self.ctx, search, loop=loop, download=False, priority=BULK)
+
+        async def produce():
+            try:
+                async for line in lines:
+                    search = line.strip()
+                    if not search:
+                        continue
+
+                    self.read += 1
+                    await pending.put(loop.create_task(resolve(search)))
+
+            except Exception:
+                # A broken file ends the import with the songs which were read so far
+                pass
+
+            await pending.put(None)
+
+        producer = loop.create_task(produce())
+        self.report(force=True)
+
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    break
+
+                try:
+                    source = await task
+                except Exception:
+                    self.failed += 1
+                    continue
+
+                if not self.active():
+                    break
+
+                self.player.queue.put(source)
+                self.player.prefetcher.refresh()
+                self.added += 1
+
+                self.report()
+
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+
+            self.finished = True
+            self.report(force=True)
+
+    def describe(self):
+        state = 'Added' if self.finished else 'Adding'
+        text = f'{self.ctx.author.mention}: {state} **{self.added}** songs from the playlist to the Queue.'
+        if not self.finished:
+            text += f' ({self.read} read so far)'
+        if self.failed:
+            text += f'\n{self.failed} songs could not be found.'
+        return text
+
+    def report(self, force=False):
+        # The progress message is edited at most once every PLAYALL_PROGRESS_INTERVAL seconds
+        now = time.monotonic()
+        if not force and now - self._last_edit < config.PLAYALL_PROGRESS_INTERVAL:
+            return
+
+        self._last_edit = now
+        embed = discord.Embed(description=self.describe(), colour=discord.Colour.blue())
+        outbox_for(self.ctx.channel, self.ctx.bot.loop).update(('playall', id(self)), embed, last=self.finished)
@@ -0,0 +1,113 @@
+# This class prepares the upcoming songs of a guild while the current song is playing
+# The bot will use the instance of this class inside each music player
+
+# This is used to implement the asynchronous operations like the background tasks
+import asyncio
+
+# This is used to call upon the YTDLsource class
+from song import YTDLSource, TrackSource
+
+# This is used to let the play commands go before the songs further down the queue
+from extractor import INTERACTIVE, BULK
+
+# This import brings in the prefetch settings
+import config
+
+
+class Prefetcher:
+    # The first entries of the queue are resolved in the background so the next song starts at once
+    # Only the next song gets its ffmpeg process started, the rest only get their stream links
+
+    __slots__ = ('player', 'depth', 'open_source', '_tasks', '_sources')
+
+    def __init__(self, player, depth=None, open_source=None):
+        self.player = player
+        self.depth = config.PREFETCH_DEPTH if depth is None else depth
+        self.open_source = config.PREFETCH_OPEN_SOURCE if open_source is None else open_source
+
+        # Both are keyed by the id of the TrackQueue entry and keep its song, which the player hands to take
+        self._tasks = {}
+        self._sources = {}
+
+    def upcoming(self):
+        return self.player.queue.entries(0, self.depth)
+
+    def refresh(self):
+        # This must be called whenever the queue changes or a new song starts
+        # Work for entries which left the prefetch window is dropped, new entries are scheduled
+        upcoming = self.upcoming()
+        window = {queued.id for queued in upcoming}
+        head = upcoming[0].id if upcoming else None
+
+        for key, (entry, task) in list(self._tasks.items()):
+            if key not in window:
+                task.cancel()
+                del self._tasks[key]
+
+        for key, (entry, source) in list(self._sources.items()):
+            if key not in window or (head is not None and key != head):
+                source.cleanup()
+                del self._sources[key]
+
+        loop = self.player.bot.loop
+        for position, queued in enumerate(upcoming):
+            key, entry = queued.id, queued.item
+            if isinstance(entry, TrackSource) or key in self._tasks or key in self._sources:
+                continue
+
+            open_source = self.open_source and position == 0
+            priority = INTERACTIVE if position == 0 else BULK
+            self._tasks[key] = (entry, loop.create_task(self._prefetch(key, entry, open_source, priority)))
+
+    async def _prefetch(self, key, entry, open_source, priority):
+        try:
+            if open_source:
+                source = await YTDLSource.regather_stream(entry, loop=self.player.bot.loop, guild=self.player._guild.id,
+                                                          priority=priority, volume=self.player.volume)
+                self._sources[key] = (entry, source)
+            else:
+                await YTDLSource.resolve_stream(entry, loop=self.player.bot.loop, guild=self.player._guild.id,
+                                                priority=priority)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            # The error will be reported to the guild when the player reaches this song
+            pass
+
+        finally:
+            # A cancelled task may finish after a new one was scheduled for the same entry
+            if self._tasks.get(key, (None, None))[1] is asyncio.current_task():
+                del self._tasks[key]
+
+    def _key(self, work, entry):
+        # The player only knows the song it took from the queue, the window holds at most depth entries
+        return next((key for key, (queued, _) in work.items() if queued is entry), None)
+
+    async def take(self, entry):
+        # Returns the source opened for the song if there is one
+        # If the song is still being prefetched the player waits for it instead of extracting it again
+        key = self._key(self._tasks, entry)
+        if key is not None:
+            _, task = self._tasks.pop(key)
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                pass
+
+        key = self._key(self._sources, entry)
+        if key is None:
+            return None
+
+        return self._sources.pop(key)[1]
+
+    def clear(self):
+        # Drops every prefetched song, used when the queue is cleared or the player is destroyed
+        for entry, task in self._tasks.values():
+            task.cancel()
+        for entry, source in self._sources.values():
+            source.cleanup()
+
+        self._tasks.clear()
+        self._sources.clear()
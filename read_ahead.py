@@ -0,0 +1,129 @@
+# This class reads the frames of an audio source ahead of the playback on its own thread
+# discord.py reads a frame every 20ms, a slow read from the ffmpeg pipe would be heard as a stutter
+# If the buffer runs dry in the middle of a song a silent frame is played instead of waiting
+
+# This is used to keep the frames which were read ahead
+from collections import deque
+
+# This is used to read the frames on a background thread
+import threading
+
+# This is used to measure the time between two frames
+import time
+
+# This brings in the discord library
+import discord
+
+# This is used to record the underruns, the buffer depth and the jitter of every guild
+from metrics import registry
+
+# The length of an audio frame in seconds
+FRAME_LENGTH = 0.02
+
+# A silent 20ms stereo pcm frame and a silent opus frame
+PCM_SILENCE = b'\0' * 3840
+OPUS_SILENCE = b'\xf8\xff\xfe'
+
+# A longer time between two frames means the song was paused, it is not counted as jitter
+PAUSE_LENGTH = 1.0
+
+# Longest time in seconds the first frame is waited for, a source which produces nothing by then has ended
+FIRST_FRAME_TIMEOUT = 30
+
+
+class ReadAheadSource(discord.AudioSource):
+
+    __slots__ = ('original', 'capacity', 'silent', '_frames', '_ready', '_started', '_eof', '_closed', '_last_read',
+                 '_guild', '_depth', '_jitter')
+
+    def __init__(self, original, *, frames, guild=None):
+        self.original = original
+        self.capacity = max(frames, 1)
+        self.silent = 0  # Number of silent frames played because the buffer ran dry
+
+        self._frames = deque()
+        self._ready = threading.Condition()
+        self._started = False  # Set by the first frame, the start of the song is waited for instead of filled
+        self._eof = False
+        self._closed = False
+        self._last_read = None
+
+        self._guild = guild
+        self._depth = registry.histogram('audio_buffer_depth_seconds', guild=guild)
+        self._jitter = registry.histogram('audio_frame_jitter_seconds', guild=guild)
+
+        threading.Thread(target=self._fill, name='audio-read-ahead', daemon=True).start()
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def _fill(self):
+        # Runs on the reader thread until the song ended or the source was cleaned up
+        # A source which raises, like a fallback ffmpeg which could not start, ends the song
+        try:
+            while True:
+                with self._ready:
+                    while len(self._frames) >= self.capacity and not self._closed:
+                        self._ready.wait()
+                    if self._closed:
+                        break
+
+                data = self.original.read()
+                if not data:
+                    break
+
+                with self._ready:
+                    if self._closed:
+                        break
+                    self._frames.append(data)
+                    self._ready.notify_all()
+        finally:
+            with self._ready:
+                self._eof = True
+                self._ready.notify_all()
+
+        if self._closed:
+            # The source may have been cleaned up while the thread was reading from it
+            self.original.cleanup()
+
+    def read(self):
+        now = time.perf_counter()
+        if self._last_read is not None and now - self._last_read < PAUSE_LENGTH:
+            self._jitter.observe(abs(now - self._last_read - FRAME_LENGTH))
+        self._last_read = now
+
+        with self._ready:
+            if not self._started:
+                # The first frame is waited for, like discord.py would wait for ffmpeg
+                self._ready.wait_for(lambda: self._frames or self._eof or self._closed, FIRST_FRAME_TIMEOUT)
+                self._started = True
+                if not self._frames:
+                    return b''
+
+            self._depth.observe(len(self._frames) * FRAME_LENGTH)
+            if self._frames:
+                data = self._frames.popleft()
+                self._ready.notify_all()
+                return data
+
+            if self._eof or self._closed:
+                return b''
+
+        self.silent += 1
+        registry.inc('audio_underruns_total', guild=self._guild)
+        return OPUS_SILENCE if self.is_opus() else PCM_SILENCE
+
+    def cleanup(self):
+        with self._ready:
+            self._closed = True
+            self._frames.clear()
+            self._ready.notify_all()
+        self.original.cleanup()
+
+
+def bufferStats(guild):
+    # The read ahead statistics of a guild for the stats command
+    underruns = registry.counters.get('audio_underruns_total', {}).get((('guild', guild),), 0)
+    depth = registry.histograms.get('audio_buffer_depth_seconds', {}).get((('guild', guild),))
+    jitter = registry.histograms.get('audio_frame_jitter_seconds', {}).get((('guild', guild),))
+    return {'underruns': underruns, 'depth': depth.stats() if depth else None, 'jitter': jitter.stats() if jitter else None}
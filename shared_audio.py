@@ -0,0 +1,164 @@
+# This class lets the guilds which play the same song at the same time share a single ffmpeg process
+# The frames produced by ffmpeg are kept in a ring buffer which every guild reads at its own offset
+# The ffmpeg process is cleaned up once the last guild stopped listening
+
+# This is used to share the streams between the audio threads of the guilds
+import threading
+
+# This brings in the discord library
+import discord
+
+# This import brings in the shared audio settings
+import config
+
+# This is used to count the shared and the private streams
+from metrics import registry
+
+# The length of an audio frame in seconds
+FRAME_LENGTH = 0.02
+
+
+class SharedStream:
+    # The frames of a song read from a single ffmpeg process
+    # The frame at offset n is kept until capacity newer frames were read
+
+    __slots__ = ('key', 'source', 'capacity', 'head', 'eof', 'listeners', '_ring', '_lock')
+
+    def __init__(self, key, source, capacity):
+        self.key = key
+        self.source = source
+        self.capacity = capacity
+        self.head = 0  # Offset of the next frame ffmpeg will produce
+        self.eof = False
+        self.listeners = 0
+
+        self._ring = [None] * capacity
+        self._lock = threading.Lock()
+
+    def joinable(self):
+        # A new listener starts at the first frame, so it must still be in the ring
+        return self.head < self.capacity and not (self.eof and not self.head)
+
+    def frame(self, offset):
+        # Returns the frame at the offset, b'' once the song ended or None if the frame left the ring
+        # The listener which is the furthest ahead reads the next frame from ffmpeg
+        with self._lock:
+            while offset >= self.head and not self.eof:
+                data = self.source.read()
+                if not data:
+                    self.eof = True
+                    break
+
+                self._ring[self.head % self.capacity] = data
+                self.head += 1
+
+            if offset >= self.head:
+                return b''
+            if offset < self.head - self.capacity:
+                return None
+            return self._ring[offset % self.capacity]
+
+    def buffered(self):
+        return min(self.head, self.capacity)
+
+
+class SharedListener(discord.AudioSource):
+    # The audio source of a guild which reads a shared stream
+    # A guild which falls behind the ring, for example while it is paused, continues on its own ffmpeg process
+
+    __slots__ = ('stream', 'offset', '_shared', '_fallback', '_private', '_opus', '_closed', '_lock')
+
+    def __init__(self, shared, stream, fallback, opus):
+        self.stream = stream
+        self.offset = 0
+        self._shared = shared
+        self._fallback = fallback  # Opens a private source which starts at the given second of the song
+        self._private = None
+        self._opus = opus
+        self._closed = False
+        self._lock = threading.Lock()  # The source may be cleaned up by another thread than the one reading it
+
+    def is_opus(self):
+        return self._opus
+
+    def read(self):
+        if self._private is None:
+            data = self.stream.frame(self.offset)
+            if data is not None:
+                self.offset += 1
+                return data
+
+            with self._lock:
+                if self._closed:
+                    return b''
+                registry.inc('shared_audio_fallbacks_total')
+                self._private = self._fallback(self.offset * FRAME_LENGTH)
+                self._shared.release(self.stream)
+
+        return self._private.read()
+
+    def cleanup(self):
+        # Called by the voice client and by the player, the stream is only released once
+        with self._lock:
+            if self._closed:
+                return
+
+            self._closed = True
+            if self._private is not None:
+                self._private.cleanup()
+            else:
+                self._shared.release(self.stream)
+
+
+class SharedAudio:
+    # The shared streams of the songs which are being played, keyed by the song and its ffmpeg settings
+
+    __slots__ = ('seconds', '_streams', '_lock', '_opened', '_joined')
+
+    def __init__(self, seconds):
+        self.seconds = seconds  # Length of the ring buffer of every stream
+        self._streams = {}  # key -> stream new listeners join
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._joined = 0
+
+    def listen(self, key, open_source, fallback, *, opus=False):
+        # open_source starts the ffmpeg process if no stream of the key can be joined
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None and stream.joinable():
+                stream.listeners += 1
+                self._joined += 1
+                registry.inc('shared_audio_listeners_total', result='joined')
+                return SharedListener(self, stream, fallback, opus)
+
+        source = open_source()
+        stream = SharedStream(key, source, max(int(self.seconds / FRAME_LENGTH), 1))
+        stream.listeners = 1
+        with self._lock:
+            # The stream of a song which is already far in replaces it for new listeners
+            self._streams[key] = stream
+            self._opened += 1
+        registry.inc('shared_audio_listeners_total', result='opened')
+        return SharedListener(self, stream, fallback, opus)
+
+    def release(self, stream):
+        with self._lock:
+            stream.listeners -= 1
+            if stream.listeners:
+                return
+            if self._streams.get(stream.key) is stream:
+                del self._streams[stream.key]
+
+        stream.source.cleanup()
+
+    def stats(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        return {'streams': len(streams), 'listeners': sum(stream.listeners for stream in streams),
+                'buffered_frames': sum(stream.buffered() for stream in streams),
+                'opened': self._opened, 'joined': self._joined}
+
+
+# The shared streams of every guild, used if SHARED_AUDIO is enabled
+sharedAudio = SharedAudio(config.SHARED_AUDIO_BUFFER)
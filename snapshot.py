@@ -0,0 +1,138 @@
+# This class saves the queues of the guilds to a compact file so they survive a restart of the bot
+# The saved queues are restored lazily, a guild gets its player back once a command is used in it again
+# so a restart does not connect every voice channel and resolve every song at once
+
+# This is used to implement the asynchronous operations like the periodic snapshots
+import asyncio
+
+# This is used to compress the snapshot file
+import gzip
+
+# This is used to write the snapshot file
+import json
+
+# This import brings in the file handling capabilities
+import os
+
+# This is used to expire the old snapshots
+import time
+
+# This is the compact record of the queued songs
+from track import Track
+
+# This is used to read the song and the position of the current source
+from song import TrackSource
+
+# This import brings in the snapshot settings
+import config
+
+
+def capture(player):
+    # Returns the record of a player, the current song is the first song of the queue and pos is its position
+    # A record only holds numbers, strings and lists so it is written as json
+    tracks = []
+    position = None
+
+    current = player.current
+    if isinstance(current, TrackSource):
+        tracks.append(current.track)
+        position = round(current.position, 2)
+
+    for entry in player.queue:
+        tracks.append(entry.track if isinstance(entry, TrackSource) else entry)
+
+    voice = player._guild.voice_client
+    return {'t': int(time.time()), 'c': player._channel.id, 'v': voice.channel.id if voice is not None else None,
+            'vol': player.volume, 'pos': position, 'q': [track.astuple() for track in tracks]}
+
+
+def restore(player, record):
+    # Queues the songs of the record, their stream links are resolved by the prefetcher as they near the head
+    tracks = [Track(*values) for values in record['q']]
+    if tracks and record.get('pos'):
+        player.resume = (tracks[0], record['pos'])
+
+    player.volume = record['vol']
+    for track in tracks:
+        player.queue.put(track)
+    player.prefetcher.refresh()
+    return len(tracks)
+
+
+def _write(path, records):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # The file is replaced at once so a crash while writing keeps the previous snapshot
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as wp:
+        json.dump(records, wp, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+
+class Snapshots:
+
+    __slots__ = ('path', 'interval', 'max_age', '_pending')
+
+    def __init__(self, shard_id=None, path=None, interval=None, max_age=None):
+        path = config.SNAPSHOT_PATH if path is None else path
+        if path and shard_id is not None:
+            root, ext = os.path.splitext(path)
+            path = f'{root}-shard{shard_id}{ext}'
+        self.path = path
+        self.interval = config.SNAPSHOT_INTERVAL if interval is None else interval
+        self.max_age = config.SNAPSHOT_MAX_AGE if max_age is None else max_age
+
+        # guild id -> record of a guild which has not been active since the snapshot was restored
+        self._pending = {}
+
+    def load(self):
+        # Reads the snapshot written before the restart, a missing or broken file restores nothing
+        if not self.path:
+            return 0
+
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as fp:
+                records = json.load(fp)
+        except (OSError, ValueError):
+            return 0
+
+        oldest = time.time() - self.max_age
+        self._pending = {int(guild): record for guild, record in records.items() if record['t'] >= oldest}
+        return len(self._pending)
+
+    def put(self, guild_id, record):
+        self._pending[guild_id] = record
+
+    def take(self, guild_id):
+        return self._pending.pop(guild_id, None)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._pending
+
+    def __len__(self):
+        return len(self._pending)
+
+    def records(self, players):
+        # The records of the live players and of the guilds which were not active again yet
+        records = {str(guild): record for guild, record in self._pending.items()}
+        for guild, player in players.items():
+            record = capture(player)
+            if record['q']:
+                records[str(guild)] = record
+        return records
+
+    def save(self, players):
+        # Writes the snapshot right away, used when the bot is closing
+        if self.path:
+            _write(self.path, self.records(players))
+
+    async def run(self, players):
+        # The records are captured on the event loop, the file is compressed and written in the executor
+        loop = asyncio.get_event_loop()
+        while self.path:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(None, _write, self.path, self.records(players))
+
+    def stats(self):
+        return {'pending': len(self._pending)}
@@ -1,8 +1,5 @@
 # This class is to create a stream for the required song or download it
 
-# This youtube_dl is used to search the songs and download it from the youtube platform
-import youtube_dl
-
 # This Embed class is used to create a custom embed message for the specific class
 import discord
 
@@ -12,12 +9,49 @@ from discord.ext import commands
 # This is used to implement the asynchronous operations like building a dynamic queue
 import asyncio
 
-# This is used to create a coroutine in the async event loop
-from functools import partial
+# This import brings in the iteration tools
+import itertools
 
 # This is used to create a asynchronous timer
 from async_timeout import timeout
 
+# This is used to reuse the songs which were already searched by any guild
+from cache import trackCache
+
+# This is used to reuse the songs which were resolved before the bot restarted
+from track_index import trackIndex
+
+# This is used to run the youtube_dl extractions on a dedicated pool shared by the guilds
+from extractor import ExtractorPool, INTERACTIVE
+
+# This is the compact record of the queued songs
+from track import Track
+
+# This is used to play the songs which are kept on the disk
+from audio_cache import audioCache
+
+# This is used to share the ffmpeg process of a song played by several guilds at once
+from shared_audio import sharedAudio, FRAME_LENGTH
+
+# This is used to read the audio ahead of the playback so a slow read is not heard
+from read_ahead import ReadAheadSource
+
+# This is used to play every song at an even loudness
+from loudness import loudness
+
+# This import brings in the audio settings
+import config
+
+# This is used to record the time spent in each stage of a song
+import time
+from metrics import registry
+
+# This is used to report the time to the first played song after the start of the bot
+from startup import startupProfile
+
+# This is used to recognize the playlist links
+from urllib.parse import urlparse, parse_qs
+
 YTDL_OPTS = {
     "default_search": "auto",
     "format": "bestaudio/best",
@@ -25,41 +59,230 @@ YTDL_OPTS = {
     "noplaylist": True,
     "restrictfilenames": True,
     "no_warnings": True,
-    "outtmpl": 'downloads/%(extractor)s-%(id)s-%(title)s.%(ext)s',
+    "outtmpl": f'{config.AUDIO_CACHE_DIR}/%(extractor)s-%(id)s.%(ext)s',
     'nocheckcertificate': True,
     'ignoreerrors': False,
     'logtostderr': False,
     'source_address': '0.0.0.0'  # ipv6 addresses cause issues sometimes
 }
 
+# Playlist links are read without extracting their songs, the songs are resolved once they near the head of the queue
+YTDL_FLAT_OPTS = dict(YTDL_OPTS, noplaylist=False, extract_flat='in_playlist', playlistend=config.PLAYLIST_IMPORT_LIMIT)
+
 ffmpegopts = {
     'before_options': '-nostdin -reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
     'options': '-vn'
 }
 
-ytdl = youtube_dl.YoutubeDL(YTDL_OPTS)
+# The local files need no reconnect options
+localopts = {
+    'before_options': '-nostdin',
+    'options': '-vn'
+}
+
+ytdl = ExtractorPool(YTDL_OPTS, YTDL_FLAT_OPTS)
 
 
-class YTDLSource(discord.PCMVolumeTransformer):
+def _read_ahead(source, guild):
+    # Wraps the source in a read ahead buffer unless READAHEAD_SECONDS is 0
+    if config.READAHEAD_SECONDS <= 0:
+        return source
+    return ReadAheadSource(source, frames=int(config.READAHEAD_SECONDS / FRAME_LENGTH), guild=guild)
 
-    def __init__(self, source, *, data, requester):
-        super().__init__(source)
 
-        self.requester = requester
+def _options(track, opts):
+    # The output options of a pcm ffmpeg process, the loudness gain of the song is applied by ffmpeg
+    gain = loudness.gain(track.video_id) if config.LOUDNESS_NORMALIZE else None
+    if not gain:
+        return opts['options']
+    return f"{opts['options']} -filter:a volume={gain:.2f}dB"
+
+
+def _seek(opts, start):
+    # The before options of ffmpeg which start the song at the given second
+    if not start:
+        return opts['before_options']
+    return f"{opts['before_options']} -ss {start:.2f}"
+
 
-        self.title = data.get('title')
-        self.web_url = data.get('webpage_url')
+class TrackSource:
+    # The attributes shared by the audio sources of the bot
+
+    # False if a volume change only applies once ffmpeg is started again
+    live_volume = True
+
+    def _track(self, track):
+        self.track = track
+
+        self.title = track.title
+        self.web_url = track.webpage_url
+
+        # Number of audio frames read from ffmpeg, zero means the stream could not be opened
+        self.frames = 0
+
+        # The second of the song ffmpeg was started at, set when the song was seeked or resumed
+        self.start = 0
+
+        # Set by the skip command, a song which was skipped is not resumed
+        self.skipped = False
+
+        # Set by the player when the playback starts, the first frame records the startup latencies
+        self.play_started = None
+        self.wait_started = None  # Since when the listeners were waiting for this song
+        self.gap_started = None  # When the previous song ended, if this song followed it directly
+
+        # True if the stream link was reused instead of extracted right before the playback
+        self.reused_stream = False
 
     def __getitem__(self, item: str):
         # This funtion allows us to access attributes similar to a  dictionary accessing
         return self.__getattribute__(item)
 
+    @property
+    def position(self):
+        # The second of the song which is playing, every frame is 20ms of audio
+        # The silent frames played while the read ahead buffer was empty are not part of the song
+        return self.start + (self.frames - getattr(self.original, 'silent', 0)) * FRAME_LENGTH
+
+    def read(self):
+        return self._count(super().read())
+
+    def _count(self, data):
+        if data:
+            self.frames += 1
+            if self.frames == 1 and self.play_started is not None:
+                self._first_frame()
+        return data
+
+    def _first_frame(self):
+        # Runs on the audio thread when ffmpeg delivered the first frame
+        now = time.monotonic()
+        registry.observe('first_frame_seconds', now - self.play_started)
+        if self.wait_started is not None:
+            registry.observe('time_to_first_audio_seconds', now - self.wait_started)
+        if self.gap_started is not None:
+            registry.observe('inter_track_gap_seconds', now - self.gap_started)
+        if startupProfile.mark('first_track'):
+            startupProfile.report('first_track')
+
+
+class YTDLOpusSource(TrackSource, discord.AudioSource):
+    # The opus mode lets ffmpeg apply the volume and produce the opus frames,
+    # so discord.py neither decodes nor encodes the audio in python
+    # Opus streams played at full volume are copied without encoding them again
+
+    # The running ffmpeg process keeps the volume it was started with
+    live_volume = False
+
+    def __init__(self, url, *, track, volume, opts=ffmpegopts, start=0, original=None, guild=None):
+        # original is an opus source which is already open, like a stream shared with the other guilds
+        if original is None:
+            original = _read_ahead(discord.FFmpegOpusAudio(url, **self.ffmpeg_args(track, volume, opts, start)), guild)
+
+        self.original = original
+        self.volume = volume
+        self._track(track)
+        self.start = start
+
+    @staticmethod
+    def ffmpeg_args(track, volume, opts, start=0):
+        # start is the second of the song ffmpeg begins at
+        # The loudness gain of the song and the volume are applied by a single ffmpeg filter
+        gain = loudness.gain(track.video_id) if config.LOUDNESS_NORMALIZE else None
+        if gain:
+            volume *= 10 ** (gain / 20)
+
+        codec = 'opus' if track.acodec == 'opus' and volume == 1.0 else None
+        options = opts['options'] if codec else f"{opts['options']} -filter:a volume={volume:.3f}"
+        return {'bitrate': config.OPUS_BITRATE, 'codec': codec, 'before_options': _seek(opts, start),
+                'options': options}
+
+    def is_opus(self):
+        return True
+
+    def read(self):
+        return self._count(self.original.read())
+
+    def cleanup(self):
+        self.original.cleanup()
+
+
+class YTDLSource(TrackSource, discord.PCMVolumeTransformer):
+
+    def __init__(self, source, *, track):
+        super().__init__(source)
+        self._track(track)
+
+    @classmethod
+    def open_stream(cls, track, url, *, volume, start=0, guild=None):
+        # Starts ffmpeg for the stream link of the song in the configured audio mode
+        # The local file is played instead of the stream link if the song is in the audio cache
+        # start is the second the playback begins at, used to seek and to resume a broken stream
+        local = audioCache.path(track.video_id)
+        opts = ffmpegopts
+        if local is not None:
+            url = local
+            opts = localopts
+
+        if config.SHARED_AUDIO and not start:
+            return cls.open_shared(track, url, opts, volume=volume, guild=guild)
+
+        if config.AUDIO_MODE == 'opus':
+            return YTDLOpusSource(url, track=track, volume=volume, opts=opts, start=start, guild=guild)
+
+        ffmpeg = discord.FFmpegPCMAudio(source=url, before_options=_seek(opts, start), options=_options(track, opts))
+        source = cls(_read_ahead(ffmpeg, guild), track=track)
+        source.volume = volume
+        source.start = start
+        return source
+
+    @classmethod
+    def open_shared(cls, track, url, opts, *, volume, guild=None):
+        # The guilds share the decoded audio and apply their own volume in the pcm mode
+        # In the opus mode ffmpeg applies the volume, so only the guilds playing at the same volume share a stream
+        if config.AUDIO_MODE == 'opus':
+            # The key holds the ffmpeg options, so a stream opened before the loudness gain was known is not joined
+            args = YTDLOpusSource.ffmpeg_args(track, volume, opts)
+
+            def start(seconds=0):
+                return discord.FFmpegOpusAudio(url, **dict(args, before_options=_seek(opts, seconds)))
+
+            listener = sharedAudio.listen(('opus', track.video_id, args['codec'], args['options']), start, start,
+                                          opus=True)
+            return YTDLOpusSource(url, track=track, volume=volume, original=_read_ahead(listener, guild))
+
+        options = _options(track, opts)
+
+        def start(seconds=0):
+            return discord.FFmpegPCMAudio(source=url, before_options=_seek(opts, seconds), options=options)
+
+        listener = sharedAudio.listen(('pcm', track.video_id, options), start, start)
+        source = cls(_read_ahead(listener, guild), track=track)
+        source.volume = volume
+        return source
+
     @classmethod
-    async def create_source(cls, ctx, search: str, *, loop, download=False):
+    async def create_source(cls, ctx, search: str, *, loop, download=False, priority=INTERACTIVE):
+        # priority is BULK for the songs imported with playall so they do not delay the play command
+        # If download is False the Track record is returned, its stream link is kept in the shared cache
         loop = loop or asyncio.get_event_loop()
 
-        to_run = partial(ytdl.extract_info, url=search, download=download)
-        data = await loop.run_in_executor(None, to_run)
+        if not download:
+            # The same search or link may have been resolved recently in any guild
+            cached = trackCache.lookup(search)
+            if cached is not None:
+                registry.inc('track_lookups_total', source='memory')
+                return Track.create(cached, ctx.author)
+
+            # The song may have been resolved before the restart, only the stream link is missing then
+            indexed = await trackIndex.lookup(search)
+            if indexed is not None:
+                registry.inc('track_lookups_total', source='index')
+                return Track.create(trackCache.store(search, indexed), ctx.author)
+
+            registry.inc('track_lookups_total', source='extractor')
+
+        data = await ytdl.extract_info(search, download=download, guild=ctx.guild.id, priority=priority)
 
         if 'entries' in data:
             data = data['entries'][0]
@@ -67,17 +290,96 @@ class YTDLSource(discord.PCMVolumeTransformer):
         if download:
             source = ytdl.prepare_filename(data)
         else:
-            return {'webpage_url': data['webpage_url'], 'requester': ctx.author, 'title': data['title']}
+            trackIndex.remember(search, data)
+            return Track.create(trackCache.store(search, data), ctx.author)
+
+        return cls(discord.FFmpegPCMAudio(source, **ffmpegopts), track=Track.create(data, ctx.author))
+
+    @staticmethod
+    def is_playlist(search: str):
+        # A link to a playlist page, links to a video inside a playlist still play the single video
+        url = urlparse(search.strip())
+        if url.scheme not in ('http', 'https'):
+            return False
 
-        return cls(discord.FFmpegPCMAudio(source, **ffmpegopts), data=data, requester=ctx.author)
+        # youtu.be/<id>?list= and watch?v=<id>&list= name a video, only the /playlist page is a whole playlist
+        query = parse_qs(url.query)
+        return 'list' in query and url.path.rstrip('/') == '/playlist'
 
     @classmethod
-    async def regather_stream(cls, data, *, loop):
-        # It is used to prepare a stream, instead of downloading as the youtube links will expire.
+    async def create_playlist(cls, ctx, url: str, *, loop, limit=None):
+        # Reads the songs of a playlist link in a single flat extraction and returns their Track records
+        # The stream links are resolved later by the prefetcher or right before the playback
+        limit = config.PLAYLIST_IMPORT_LIMIT if limit is None else limit
+        data = await ytdl.extract_info(url.strip(), flat=True, guild=ctx.guild.id)
+
+        tracks = []
+        for entry in itertools.islice(data.get('entries') or (), limit):
+            link = entry and (entry.get('url') or entry.get('id'))
+            if not link:
+                # Deleted and private videos are listed without a link
+                continue
+
+            if entry.get('ie_key') == 'Youtube' or not link.startswith(('http://', 'https://')):
+                link = f"https://www.youtube.com/watch?v={entry.get('id') or link}"
+
+            tracks.append(Track(entry.get('id') or link, entry.get('title'), link, entry.get('duration'),
+                                requester_id=ctx.author.id, requester_name=str(ctx.author)))
+
+        return data.get('title'), tracks
+
+    @classmethod
+    async def resolve_stream(cls, track, *, loop, fresh=False, guild=None, priority=INTERACTIVE):
+        # Makes sure the stream link of the song is resolved without opening it
+        # The stream link resolved when the song was queued is reused while it is still valid
+        # Returns the link and True if a saved link was reused instead of extracting the song again
         loop = loop or asyncio.get_event_loop()
-        requester = data['requester']
 
-        to_run = partial(ytdl.extract_info, url=data['webpage_url'], download=False)
-        data = await loop.run_in_executor(None, to_run)
+        if not fresh:
+            if track.video_id in audioCache:
+                cls.measure(track)
+                return None, True
+
+            url = trackCache.stream_url(track.video_id)
+            if url:
+                registry.inc('stream_lookups_total', source='memory')
+                cls.measure(track)
+                return url, True
+
+        registry.inc('stream_lookups_total', source='extractor')
+
+        info = await ytdl.extract_info(track.webpage_url, download=False, guild=guild, priority=priority)
+        trackIndex.remember(info['webpage_url'], info)
+        url = trackCache.store(info['webpage_url'], info).url
+        cls.measure(track)
+        return url, False
+
+    @staticmethod
+    def measure(track):
+        # Starts measuring the loudness of the song from its file or its saved stream link, if it is not known yet
+        if not config.LOUDNESS_NORMALIZE:
+            return
+
+        local = audioCache.peek(track.video_id)
+        if local is not None:
+            loudness.prepare(track.video_id, local, localopts)
+        else:
+            loudness.prepare(track.video_id, trackCache.stream_url(track.video_id), ffmpegopts)
+
+    @classmethod
+    async def regather_stream(cls, track, *, loop, fresh=False, guild=None, priority=INTERACTIVE, volume=.5, start=0):
+        # It is used to prepare a stream, instead of downloading as the youtube links will expire.
+        # fresh forces a new extraction, used when ffmpeg could not open the saved link
+        url, reused = await cls.resolve_stream(track, loop=loop, fresh=fresh, guild=guild, priority=priority)
+
+        with registry.timer('ffmpeg_open_seconds'):
+            source = cls.open_stream(track, url, volume=volume, start=start, guild=guild)
+        source.reused_stream = reused
+        return source
 
-        return cls(discord.FFmpegPCMAudio(source=data['url'], **ffmpegopts), data=data, requester=requester)
+    @staticmethod
+    def invalidate(track):
+        # Forgets the saved stream link of a song so the next regather extracts it again
+        trackCache.invalidate_stream(track.video_id)
+        # The local file may have been removed from the disk
+        audioCache.discard(track.video_id)
@@ -0,0 +1,94 @@
+# This class measures the cold start of the bot process
+# It records the import time of every module, the time to the READY event and the time to the first played song
+# The times are measured from the start of main.py and printed once the bot is ready
+
+# This is used to wrap the import statement while the bot is starting
+import builtins
+
+# This import is used to print the report to the system logger
+import sys
+
+# This is used to time the imports of the main thread only
+import threading
+
+# This is used to measure the startup stages
+import time
+
+# This is used to export the startup stages with the other metrics
+from metrics import registry
+
+# Number of packages listed in the printed report
+SLOWEST_IMPORTS = 8
+
+
+class StartupProfile:
+
+    __slots__ = ('started', 'imports', 'stages', '_stack', '_original', '_thread')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}  # module -> seconds spent importing it, without the modules it imported
+        self.stages = {}  # stage -> seconds since the start
+
+        self._stack = []
+        self._original = None
+        self._thread = None
+
+    def trace_imports(self):
+        # Times the imports of the main thread until the bot is ready
+        if self._original is None:
+            self._original = builtins.__import__
+            self._thread = threading.get_ident()
+            builtins.__import__ = self._import
+
+    def stop_tracing(self):
+        if self._original is not None and builtins.__import__ == self._import:
+            builtins.__import__ = self._original
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules or threading.get_ident() != self._thread:
+            return self._original(name, globals, locals, fromlist, level)
+
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            self.imports[name] = self.imports.get(name, 0.0) + elapsed - children
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def mark(self, stage):
+        # Records the first time a stage was reached, later calls are ignored
+        if stage in self.stages:
+            return False
+
+        elapsed = self.stages[stage] = time.perf_counter() - self.started
+        registry.observe('startup_seconds', elapsed, stage=stage)
+        return True
+
+    def packages(self):
+        # The import time of every top level package, slowest first
+        packages = {}
+        for name, seconds in self.imports.items():
+            package = name.split('.', 1)[0]
+            packages[package] = packages.get(package, 0.0) + seconds
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    def stats(self):
+        return {'stages': dict(self.stages), 'imports': dict(self.packages()[:SLOWEST_IMPORTS * 2])}
+
+    def report(self, stage):
+        # Prints the time of a stage, the READY report lists the slowest imports as well
+        line = f'Startup: {stage} after {self.stages[stage]:.2f}s'
+        if stage == 'ready':
+            slowest = ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in self.packages()[:SLOWEST_IMPORTS])
+            line += f" (imports {self.stages.get('imports', 0.0):.2f}s, slowest: {slowest})"
+        print(line, file=sys.stderr)
+
+
+# The profile of this process
+startupProfile = StartupProfile()
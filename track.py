@@ -0,0 +1,59 @@
+# This class is the compact record of a queued song
+# The queues of every guild hold these records instead of dicts with the full member object
+
+# This is used to intern the strings shared by many records
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Track:
+    # Instances of this class are immutable, so a record can be shared by the prefetcher and the queue
+    # The stream link is not part of the record, it is kept with its expiry in the shared cache
+
+    __slots__ = ('video_id', 'title', 'webpage_url', 'duration', 'acodec', 'requester_id', 'requester_name')
+
+    def __init__(self, video_id, title, webpage_url, duration=None, acodec=None, requester_id=None,
+                 requester_name=None):
+        set_field = object.__setattr__
+        set_field(self, 'video_id', _intern(video_id))
+        set_field(self, 'title', _intern(title))
+        set_field(self, 'webpage_url', _intern(webpage_url))
+        set_field(self, 'duration', duration)
+        set_field(self, 'acodec', _intern(acodec))
+        set_field(self, 'requester_id', requester_id)
+        set_field(self, 'requester_name', _intern(requester_name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Track records can not be changed')
+
+    def __delattr__(self, name):
+        raise AttributeError('Track records can not be changed')
+
+    def __getitem__(self, item: str):
+        # This funtion allows us to access attributes similar to a  dictionary accessing
+        return getattr(self, item)
+
+    def astuple(self):
+        # The fields in the order of the constructor, the snapshots of the queues save them like this
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f'<Track {self.video_id} {self.title!r}>'
+
+    @classmethod
+    def create(cls, data, requester):
+        # data is a CachedTrack or the dict returned by youtube_dl, requester is the member who asked for it
+        if isinstance(data, dict):
+            return cls(data.get('id') or data['webpage_url'], data.get('title'), data['webpage_url'],
+                       data.get('duration'), data.get('acodec'), requester.id, str(requester))
+
+        return cls(data.video_id, data.title, data.webpage_url, data.duration, data.acodec, requester.id,
+                   str(requester))
+
+    def requester(self, guild):
+        # Looks up the member who requested the song, the saved name is used if the member left
+        member = guild.get_member(self.requester_id) if guild is not None and self.requester_id else None
+        return member or self.requester_name
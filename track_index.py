@@ -0,0 +1,224 @@
+# This class keeps a SQLite index of the resolved songs so that they survive a restart
+# Every search is mapped to a video id and the video id to its metadata
+
+# This is used to implement the asynchronous operations like awaiting the database
+import asyncio
+
+# This import brings in the file handling capabilities
+import os
+
+# This import brings in the database used by the index
+import sqlite3
+
+# This is used to record when a song was last seen
+import time
+
+# This is used to run every database call on a single thread outside of the event loop
+from concurrent.futures import ThreadPoolExecutor
+
+# This is used to normalize the searches in the same way as the memory cache
+from cache import normalize_query
+
+# This import brings in the index settings
+import config
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tracks (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    webpage_url TEXT NOT NULL,
+    duration INTEGER,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gains (
+    video_id TEXT PRIMARY KEY,
+    gain REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_last_seen ON tracks (last_seen);
+'''
+
+# Number of buffered writes which triggers a flush before the flush interval
+FLUSH_BATCH = 200
+
+# The database is compacted once this many rows have been evicted
+VACUUM_AFTER = 10000
+
+
+class TrackIndex:
+    # A single instance of this class is shared by every guild
+    # Reads and the batched writes run on one thread which owns the connection
+
+    __slots__ = ('path', 'max_tracks', 'flush_interval', 'hits', 'misses', 'evicted',
+                 '_executor', '_connection', '_pending', '_flush_handle')
+
+    def __init__(self, path=None, max_tracks=None, flush_interval=None):
+        self.path = config.INDEX_PATH if path is None else path
+        self.max_tracks = config.INDEX_MAX_TRACKS if max_tracks is None else max_tracks
+        self.flush_interval = config.INDEX_FLUSH_INTERVAL if flush_interval is None else flush_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='track-index')
+        self._connection = None
+        self._pending = []
+        self._flush_handle = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _connect(self):
+        # Runs on the index thread, the connection is opened when it is first needed
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _lookup(self, query):
+        row = self._connect().execute(
+            'SELECT t.video_id, t.title, t.webpage_url, t.duration FROM queries q '
+            'JOIN tracks t ON t.video_id = q.video_id WHERE q.query = ?', (query,)).fetchone()
+        if row is None:
+            return None
+
+        return {'id': row[0], 'title': row[1], 'webpage_url': row[2], 'duration': row[3]}
+
+    async def lookup(self, search: str):
+        # Returns the metadata of the video found for the search before, or None
+        if not self.enabled:
+            return None
+
+        loop = asyncio.get_event_loop()
+        query = normalize_query(search)
+        try:
+            data = await loop.run_in_executor(self._executor, self._lookup, query)
+        except sqlite3.Error:
+            data = None
+
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._pending.append((query, data, time.time()))
+        self._schedule_flush(loop)
+        return data
+
+    def _gain(self, video_id):
+        row = self._connect().execute('SELECT gain FROM gains WHERE video_id = ?', (video_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    async def gain(self, video_id):
+        # Returns the loudness gain in dB measured for the video before, or None
+        if not self.enabled:
+            return None
+
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self._executor, self._gain, video_id)
+        except sqlite3.Error:
+            return None
+
+    def remember_gain(self, video_id, gain):
+        # The gains are measured rarely, so they are written at once instead of being buffered
+        if self.enabled:
+            self._executor.submit(self._write_gain, video_id, gain)
+
+    def _write_gain(self, video_id, gain):
+        try:
+            with self._connect() as connection:
+                connection.execute('INSERT OR REPLACE INTO gains VALUES (?, ?)', (video_id, gain))
+        except sqlite3.Error:
+            pass
+
+    def remember(self, search: str, data):
+        # Buffers the metadata returned by youtube_dl, it is written to the disk in batches
+        if not self.enabled or not data.get('webpage_url'):
+            return
+
+        track = {'id': data.get('id') or data['webpage_url'], 'title': data.get('title'),
+                 'webpage_url': data['webpage_url'], 'duration': data.get('duration')}
+        self._pending.append((normalize_query(search), track, time.time()))
+        self._schedule_flush(asyncio.get_event_loop())
+
+    def _schedule_flush(self, loop):
+        if len(self._pending) >= FLUSH_BATCH:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        # Hands the buffered writes to the index thread
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return None
+
+        pending, self._pending = self._pending, []
+        return self._executor.submit(self._write, pending)
+
+    def _write(self, pending):
+        connection = self._connect()
+        tracks = []
+        queries = []
+        for query, track, seen in pending:
+            tracks.append((track['id'], track['title'], track['webpage_url'], track['duration'], seen))
+            queries.append((query, track['id'], seen))
+            if track['webpage_url'] != query:
+                queries.append((track['webpage_url'], track['id'], seen))
+
+        try:
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)', tracks)
+                connection.executemany('INSERT OR REPLACE INTO queries VALUES (?, ?, ?)', queries)
+            self._evict(connection)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, connection):
+        # Songs which were not seen for the longest time are removed once the index is full
+        count = connection.execute('SELECT COUNT(*) FROM tracks').fetchone()[0]
+        excess = count - self.max_tracks
+        if excess <= 0:
+            return
+
+        with connection:
+            connection.execute('DELETE FROM tracks WHERE video_id IN '
+                               '(SELECT video_id FROM tracks ORDER BY last_seen LIMIT ?)', (excess,))
+            connection.execute('DELETE FROM queries WHERE video_id NOT IN (SELECT video_id FROM tracks)')
+            connection.execute('DELETE FROM gains WHERE video_id NOT IN (SELECT video_id FROM tracks)')
+
+        before = self.evicted
+        self.evicted += excess
+        if before // VACUUM_AFTER != self.evicted // VACUUM_AFTER:
+            connection.execute('VACUUM')
+
+    def close(self):
+        # Writes the buffered songs and closes the database, used when the bot shuts down
+        self.flush()
+        self._executor.submit(self._close).result()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'pending_writes': len(self._pending),
+                'evicted': self.evicted}
+
+
+# The index which is shared by every guild
+trackIndex = TrackIndex()
@@ -0,0 +1,250 @@
+# This class implements the song queue of a guild
+# The bot will use the instance of this class inside each music player
+
+# This is used to implement the asynchronous operations like awaiting the next song
+import asyncio
+
+# This is used to find the block holding a position of the queue
+from bisect import bisect_right
+
+# This import brings in the iteration tools
+import itertools
+
+# This import brings in the shuffle function from the random class
+from random import shuffle
+
+# Number of entries kept in a block, a block is split once it is twice as large
+BLOCK_SIZE = 256
+
+
+class QueueEntry:
+    # A single song of the queue, the id stays the same while the entry is queued
+
+    __slots__ = ('id', 'item', 'block')
+
+    def __init__(self, entry_id, item, block):
+        self.id = entry_id
+        self.item = item
+        self.block = block
+
+
+class TrackQueue:
+    # The entries are kept in a list of small blocks, each entry knows its block
+    # append, popleft and remove by id only touch a single block of bounded size,
+    # positional operations bisect the block offsets and touch a single block as well
+
+    __slots__ = ('_blocks', '_offsets', '_index', '_ids', '_waiters', '_size')
+
+    def __init__(self):
+        self._blocks = []
+        self._offsets = None  # Starting position of every block, rebuilt lazily
+        self._index = {}  # entry id -> QueueEntry
+        self._ids = itertools.count(1)
+        self._waiters = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for block in self._blocks:
+            for entry in block:
+                yield entry.item
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def entries(self, start=0, stop=None):
+        # Returns the QueueEntry objects between two positions
+        stop = self._size if stop is None else min(stop, self._size)
+        if start >= stop:
+            return []
+
+        block_index, offset = self._locate(start)
+        result = []
+        for block in itertools.islice(self._blocks, block_index, None):
+            result.extend(block[offset:offset + stop - start - len(result)])
+            offset = 0
+            if len(result) >= stop - start:
+                break
+
+        return result
+
+    def slice(self, start=0, stop=None):
+        # Returns the songs between two positions, used to show a page of the queue
+        return [entry.item for entry in self.entries(start, stop)]
+
+    def _locate(self, position):
+        # Finds the block holding a position and the position inside the block
+        if self._offsets is None:
+            self._offsets = list(itertools.accumulate((len(block) for block in self._blocks), initial=0))
+
+        block_index = bisect_right(self._offsets, position) - 1
+        return block_index, position - self._offsets[block_index]
+
+    def _new_entry(self, item, block):
+        entry = QueueEntry(next(self._ids), item, block)
+        self._index[entry.id] = entry
+        self._size += 1
+        self._offsets = None
+        return entry
+
+    def _split(self, block_index):
+        # Splits a block which grew too large, the moved entries are told their new block
+        block = self._blocks[block_index]
+        if len(block) < BLOCK_SIZE * 2:
+            return
+
+        tail = block[BLOCK_SIZE:]
+        del block[BLOCK_SIZE:]
+        for entry in tail:
+            entry.block = tail
+        self._blocks.insert(block_index + 1, tail)
+
+    def _drop_if_empty(self, block):
+        if not block:
+            for block_index, other in enumerate(self._blocks):
+                if other is block:
+                    del self._blocks[block_index]
+                    break
+
+    def put(self, item):
+        # Adds a song at the end of the queue and returns the id of its entry
+        if not self._blocks or len(self._blocks[-1]) >= BLOCK_SIZE:
+            self._blocks.append([])
+
+        block = self._blocks[-1]
+        entry = self._new_entry(item, block)
+        block.append(entry)
+
+        self._wake()
+        return entry.id
+
+    def insert(self, position, item):
+        # Adds a song at a position of the queue and returns the id of its entry
+        position = max(position, 0)
+        if position >= self._size:
+            return self.put(item)
+
+        block_index, offset = self._locate(position)
+        block = self._blocks[block_index]
+        entry = self._new_entry(item, block)
+        block.insert(offset, entry)
+        self._split(block_index)
+
+        self._wake()
+        return entry.id
+
+    def get_nowait(self):
+        # Removes and returns the first song of the queue
+        if not self._size:
+            raise asyncio.QueueEmpty
+
+        block = self._blocks[0]
+        entry = block.pop(0)
+        self._discard(entry)
+        return entry.item
+
+    async def get(self):
+        # Waits for a song if the queue is empty, then removes and returns the first song
+        while not self._size:
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif self._size:
+                    # The song meant for this waiter is handed to the next one
+                    self._wake()
+                raise
+
+        return self.get_nowait()
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _discard(self, entry):
+        del self._index[entry.id]
+        self._size -= 1
+        self._offsets = None
+        self._drop_if_empty(entry.block)
+        entry.block = None
+
+    def position(self, entry_id):
+        # Returns the position of an entry in the queue
+        entry = self._index[entry_id]
+        self._locate(0)
+        for block_index, block in enumerate(self._blocks):
+            if block is entry.block:
+                return self._offsets[block_index] + block.index(entry)
+
+        raise KeyError(entry_id)
+
+    def remove(self, entry_id):
+        # Removes an entry by its id and returns its song
+        entry = self._index[entry_id]
+        entry.block.remove(entry)
+        self._discard(entry)
+        return entry.item
+
+    def pop(self, position):
+        # Removes the entry at a position and returns its song
+        if not 0 <= position < self._size:
+            raise IndexError('queue position out of range')
+
+        block_index, offset = self._locate(position)
+        entry = self._blocks[block_index].pop(offset)
+        self._discard(entry)
+        return entry.item
+
+    def move(self, entry_id, position):
+        # Moves an entry to another position, the entry keeps its id
+        entry = self._index[entry_id]
+        entry.block.remove(entry)
+        self._drop_if_empty(entry.block)
+        self._offsets = None
+        self._size -= 1
+
+        if not self._blocks or position >= self._size:
+            if not self._blocks or len(self._blocks[-1]) >= BLOCK_SIZE:
+                self._blocks.append([])
+            block_index, offset = len(self._blocks) - 1, len(self._blocks[-1])
+        else:
+            block_index, offset = self._locate(max(position, 0))
+
+        block = self._blocks[block_index]
+        block.insert(offset, entry)
+        entry.block = block
+        self._size += 1
+        self._offsets = None
+        self._split(block_index)
+
+    def shuffle(self):
+        # Shuffles the queue in place, every entry keeps its id
+        entries = [entry for block in self._blocks for entry in block]
+        shuffle(entries)
+        self._rebuild(entries)
+
+    def clear(self):
+        # Removes every song, the player waiting for the next song keeps waiting
+        for entry in self._index.values():
+            entry.block = None
+        self._rebuild([])
+        self._index.clear()
+        self._size = 0
+
+    def _rebuild(self, entries):
+        self._blocks = [entries[start:start + BLOCK_SIZE] for start in range(0, len(entries), BLOCK_SIZE)]
+        for block in self._blocks:
+            for entry in block:
+                entry.block = block
+        self._offsets = None
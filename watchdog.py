@@ -0,0 +1,98 @@
+# This class measures the lag of the event loop and logs the code which blocks it
+# A blocked event loop stops the audio of every guild and can miss the gateway heartbeat
+
+# This is used to implement the asynchronous operations like the measuring task
+import asyncio
+
+# This import is use the system logger to log the blocking code
+import sys
+
+# This is used to watch the event loop from another thread
+import threading
+
+# This is used to measure the lag
+import time
+
+# This import help us to record the stack of the blocking code
+import traceback
+
+# This is used to remember which command or player runs in a task without keeping the task alive
+from weakref import WeakKeyDictionary
+
+# This is used to record the distribution of the lag
+from metrics import Histogram
+
+# This import brings in the watchdog settings
+import config
+
+
+class LoopWatchdog:
+    # A task sleeps for a fixed interval and records how late it wakes up
+    # A thread checks that the task keeps waking up, if it does not the event loop is blocked
+    # and the stack of the event loop thread is logged with the command and guild of the running task
+
+    __slots__ = ('interval', 'threshold', 'lag', 'stalls', '_loop', '_loop_thread', '_beat', '_labels', '_stopped')
+
+    def __init__(self, interval=None, threshold=None):
+        self.interval = config.LOOP_WATCHDOG_INTERVAL if interval is None else interval
+        self.threshold = config.LOOP_WATCHDOG_THRESHOLD if threshold is None else threshold
+
+        self.lag = Histogram()
+        self.stalls = 0
+
+        self._loop = None
+        self._loop_thread = None
+        self._beat = time.monotonic()
+        self._labels = WeakKeyDictionary()  # task -> (name, guild)
+        self._stopped = False
+
+    def label(self, name, guild=None, task=None):
+        # Names the task which is running, the name is logged if the task blocks the event loop
+        task = task or asyncio.current_task()
+        if task is not None:
+            self._labels[task] = (name, guild)
+
+    async def run(self):
+        # Runs on the event loop until the watchdog is stopped
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+
+        try:
+            while not self._stopped:
+                start = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self._beat = time.monotonic()
+                self.lag.observe(max(self._beat - start - self.interval, 0.0))
+        finally:
+            self._stopped = True
+
+    def stop(self):
+        self._stopped = True
+
+    def _watch(self):
+        # Runs on the watchdog thread, a single report is logged for every stall
+        reported = False
+        while not self._stopped:
+            time.sleep(self.interval)
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled < self.threshold:
+                reported = False
+            elif not reported:
+                reported = True
+                self.stalls += 1
+                self._report(stalled)
+
+    def _report(self, stalled):
+        frame = sys._current_frames().get(self._loop_thread)
+        task = asyncio.current_task(self._loop)
+        name, guild = self._labels.get(task, (None, None)) if task is not None else (None, None)
+
+        print(f'Event loop blocked for {stalled * 1000:.0f}ms in {name or task or "a callback"}'
+              f'{f" of guild {guild}" if guild else ""}:', file=sys.stderr)
+        if frame is not None:
+            traceback.print_stack(frame, file=sys.stderr)
+
+    def stats(self):
+        return dict(self.lag.stats(), stalls=self.stalls)